@@ -0,0 +1,205 @@
+import json
+import math
+import sys
+import time
+import typing
+
+import board_cache
+import exhaustive
+import logger
+import protocol
+import solver
+from dictionary import CompiledDictionary
+from spellcast import *
+from wizard import SpellCastCharFactory, iter_selections
+
+LOGGER = logger.Logger("Batch", sys.stderr)
+
+
+def parse_cell(text: str) -> tuple[str, float, bool]:
+	# "<char>", "<char> <multiplier>" or "<char> <multiplier> true", the same format as the interactive input
+	parts = text.split()
+	if len(parts) == 0 or len(parts) > 3:
+		raise Exception(f"invalid cell \"{text}\"")
+
+	char = parts[0].lower()
+	if len(char) != 1 or not char in LETTERS:
+		raise Exception(f"invalid char \"{parts[0]}\"")
+
+	multiplier = 1.0
+	if len(parts) > 1:
+		try:
+			multiplier = float(parts[1])
+		except ValueError:
+			raise Exception(f"invalid multiplier \"{parts[1]}\"")
+
+	mark_double = len(parts) > 2 and parts[2] == "true"
+
+	return char, multiplier, mark_double
+
+
+def board_size(cells: list[str]) -> int:
+	# side of the square board the cells fill
+	size = math.isqrt(len(cells))
+	if size < 1 or size * size != len(cells):
+		raise Exception(f"{len(cells)} cells do not make a square board")
+
+	return size
+
+
+def parse_board(cells: list[str], size: typing.Union[int, None] = None) -> SpellCastMap:
+	# cells in input order, x first then y. Without a size the board is as large as the cells fill
+	if size is None:
+		size = board_size(cells)
+
+	if len(cells) != size * size:
+		raise Exception(f"a {size}x{size} board needs {size * size} cells, got {len(cells)}")
+
+	factory = SpellCastCharFactory()
+	spellcast_m = SpellCastMap(size)
+	for index, text in enumerate(cells):
+		char, multiplier, mark_double = parse_cell(text)
+		spellcast_m.set(factory.get(Vector(index % size, index // size), SingleChar(char), multiplier, mark_double))
+	spellcast_m.generate_map_by_char()
+
+	return spellcast_m
+
+
+def read_records(stream: typing.TextIO) -> typing.Iterator[tuple[int, list[str]]]:
+	# boards are separated by blank lines, lines starting with # are comments. yields (first line number, cells)
+	cells = []
+	first = 0
+	for number, line in enumerate(stream, 1):
+		line = line.strip()
+		if line.startswith("#"):
+			continue
+
+		if line == "":
+			if len(cells) > 0:
+				yield first, cells
+				cells = []
+			continue
+
+		if len(cells) == 0:
+			first = number
+		cells.append(line)
+
+	if len(cells) > 0:
+		yield first, cells
+
+
+def solve(spellcast_m: SpellCastMap, word_dictionary: CompiledDictionary, engine: str = "trie",
+		  swap_available: int = 1, top: typing.Union[int, None] = None,
+		  word_filter: typing.Union["prefilter.Prefilter", None] = None) -> list[Selection]:
+	if engine == "trie":
+		if top is not None:
+			return solver.solve(spellcast_m, word_dictionary.trie, top, swap_available)
+		return solver.TrieSolver(word_dictionary.trie).solve(spellcast_m, swap_available)
+
+	if word_filter is None:
+		raise Exception(f"engine \"{engine}\" needs a prefilter")
+
+	words = [word_dictionary.words[int(word_id)] for word_id in word_filter.survivors(spellcast_m, swap_available)]
+	if engine == "exhaustive":
+		return exhaustive.find_selection_exhaustive(spellcast_m, words, swap_available)
+
+	# the wizard yields every path of a word, keep the best one like the other engines
+	return solver.best_per_word(selection for _, selection in iter_selections(spellcast_m, words, swap_available))
+
+
+def selection_record(selection: Selection) -> dict:
+	return {
+		"word": selection.get_raw_text(),
+		"score": selection.get_total_value(),
+		"path": [[c.v.x, c.v.y] for c in selection.get().values()],
+		"swaps": [{"x": c.v.x, "y": c.v.y, "from": c.swapped_from.c.char, "to": c.c.char}
+				  for c in selection.get_swapped()],
+	}
+
+
+def record_selection(spellcast_m: SpellCastMap, result: dict) -> Selection:
+	# a selection_record back on its board, the score is computed again from the cells
+	swaps = {(swap["x"], swap["y"]): swap["to"] for swap in result["swaps"]}
+	selection = Selection()
+	for x, y in result["path"]:
+		char = spellcast_m.get_at(x, y)
+		if (x, y) in swaps:
+			char = solver.swap_char(char, LETTERS.index(swaps[(x, y)]))
+		selection.next(char)
+
+	return selection
+
+
+def cache_key(spellcast_m: SpellCastMap, word_dictionary: CompiledDictionary, engine: str, swap_available: int,
+			  top: typing.Union[int, None], limit: int, shards: typing.Union[list[str], None] = None,
+			  all_paths: bool = False, deadline_ms: typing.Union[float, None] = None) -> str:
+	# the board cache key of every caller, with everything besides the board and the dictionary that changes a record
+	return board_cache.board_key(spellcast_m, word_dictionary.fingerprint, {
+		"engine": engine,
+		"swap": swap_available,
+		"top": top,
+		"limit": limit,
+		"shards": shards,
+		"all_paths": all_paths,
+		"deadline_ms": deadline_ms,
+	})
+
+
+def board_record(board: int, selections: list[Selection], elapsed: float, limit: int = protocol.RESULT_LIMIT) -> dict:
+	ranked = sorted(selections, key=lambda selection: selection.get_total_value(), reverse=True)
+	return {
+		"board": board,
+		"elapsed": round(elapsed, 6),
+		"found": len(selections),
+		"results": [selection_record(selection) for selection in ranked[:limit]],
+	}
+
+
+def run(source: typing.TextIO, output: typing.TextIO, word_dictionary: CompiledDictionary, engine: str = "trie",
+		swap_available: int = 1, top: typing.Union[int, None] = None, limit: int = protocol.RESULT_LIMIT,
+		size: typing.Union[int, None] = None, cache: typing.Union[board_cache.BoardCache, None] = None) -> int:
+	# one json line per board, a board that fails to parse gets an error line and the batch goes on. Boards found in
+	# the cache are not solved again
+	word_filter = None
+	if engine != "trie":
+		import prefilter
+		word_filter = prefilter.Prefilter.from_dictionary(word_dictionary)
+
+	boards = 0
+	failed = 0
+	cached = 0
+	start = time.perf_counter()
+	for board, (line, cells) in enumerate(read_records(source)):
+		try:
+			spellcast_m = parse_board(cells, size)
+		except Exception as e:
+			failed += 1
+			output.write(json.dumps({"board": board, "line": line, "error": str(e)}) + "\n")
+			continue
+
+		record = None
+		if cache is not None:
+			key = cache_key(spellcast_m, word_dictionary, engine, swap_available, top, limit)
+			record = cache.get(key)
+
+		if record is not None:
+			record = dict(record, board=board, cached=True)
+			cached += 1
+		else:
+			solve_start = time.perf_counter()
+			selections = solve(spellcast_m, word_dictionary, engine, swap_available, top, word_filter)
+			record = board_record(board, selections, time.perf_counter() - solve_start, limit)
+			if cache is not None:
+				cache.put(key, record)
+				record = dict(record, cached=False)
+
+		output.write(json.dumps(record) + "\n")
+		output.flush()
+		boards += 1
+
+	elapsed = time.perf_counter() - start
+	rate = boards / elapsed if elapsed > 0 else 0.0
+	LOGGER.info(f"Solved {boards} boards in {round(elapsed, 3)}s ({round(rate, 2)} boards/s), {failed} failed" +
+				("" if cache is None else f", {cached} from the cache"))
+
+	return boards
@@ -0,0 +1,108 @@
+import argparse
+import functools
+import http.server
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger
+import word_provider
+
+LOGGER = logger.Logger("Ingest Benchmark")
+
+
+def generate_sources(directory: str, files: int, megabytes: float, seed: int) -> list[str]:
+	# word lists with the shape of the real providers: mostly valid words, duplicates across files and some noise
+	rng = random.Random(seed)
+	letters = "etaoinshrdlucmfwypvbgkjqxz"
+	vocabulary = ["".join(rng.choice(letters) for _ in range(rng.randint(2, 12))) for _ in range(200000)]
+	noise = ["a", "don't", "naïve", "Proper", "x2"]
+
+	per_file = int(megabytes * 1024 * 1024 / files)
+	urls = []
+	for i in range(files):
+		path = os.path.join(directory, f"source-{i}.txt")
+		with open(path, "w", encoding="utf-8") as f:
+			written = 0
+			while written < per_file:
+				word = rng.choice(noise) if rng.random() < 0.05 else rng.choice(vocabulary)
+				f.write(word + "\n")
+				written += len(word) + 1
+		urls.append(pathlib.Path(path).as_uri())
+
+	return urls
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+
+	def log_message(self, format, *args):
+		pass
+
+
+def serve(directory: str) -> http.server.ThreadingHTTPServer:
+	# local stand-in for the providers, answers If-Modified-Since with 304
+	server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+def run_http(urls: list[str], directory: str, workers: int, stream_chunk_size: int) -> tuple[int, float]:
+	cache = os.path.join(directory, "cache")
+	os.makedirs(cache, exist_ok=True)
+	meta = word_provider.SourceMeta(os.path.join(cache, "sources.json"))
+	jobs = [(url, os.path.join(cache, os.path.basename(url)), meta) for url in urls]
+
+	start = time.perf_counter()
+	results = word_provider.fetch_all(jobs, None, stream_chunk_size, workers)
+	return len([changed for changed in results.values() if changed]), time.perf_counter() - start
+
+
+def run(urls: list[str], output: str, stream_chunk_size: int) -> tuple[int, float]:
+	start = time.perf_counter()
+	words = word_provider.ingest(urls, output, stream_chunk_size=stream_chunk_size)
+	return words, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="word_provider.ingest throughput against local file:// sources")
+	parser.add_argument("--megabytes", type=float, default=32.0)
+	parser.add_argument("--files", type=int, default=8)
+	parser.add_argument("--chunk", type=int, default=12 * 1024)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--http", action="store_true", help="also fetch the sources from a local http server")
+	parser.add_argument("--workers", type=int, default=word_provider.DOWNLOAD_WORKERS)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as directory:
+		LOGGER.info(f"Generating {args.megabytes}MB in {args.files} files...")
+		urls = generate_sources(directory, args.files, args.megabytes, args.seed)
+		total_bytes = sum(os.path.getsize(os.path.join(directory, f"source-{i}.txt")) for i in range(args.files))
+		output = os.path.join(directory, "output.txt")
+
+		words, elapsed = run(urls, output, args.chunk)
+		LOGGER.info(f"{words} distinct words from {round(total_bytes / 1024 / 1024, 2)}MB in {round(elapsed, 3)}s "
+					f"({round(total_bytes / 1024 / 1024 / elapsed, 2)} MB/s)")
+
+		tracemalloc.start()
+		run(urls, output, args.chunk)
+		_, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		LOGGER.info(f"Peak traced memory: {round(peak / 1024 / 1024, 2)}MB")
+
+		if args.http:
+			server = serve(directory)
+			http_urls = [f"http://127.0.0.1:{server.server_address[1]}/{os.path.basename(url)}" for url in urls]
+
+			for name in ["cold", "conditional"]:
+				changed, elapsed = run_http(http_urls, directory, args.workers, args.chunk)
+				LOGGER.info(f"HTTP {name} fetch with {args.workers} workers: {changed}/{len(http_urls)} changed in "
+							f"{round(elapsed, 3)}s ({round(total_bytes / 1024 / 1024 / elapsed, 2)} MB/s)")
+
+			server.shutdown()
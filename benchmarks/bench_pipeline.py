@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dictionary
+import logger
+import navigator
+import pipeline
+import solver
+from bench_solver import PROFILES, generate_board
+from spellcast import Vector
+
+LOGGER = logger.Logger("Pipeline Benchmark")
+
+
+def mock_navigator(size: int, delay: float) -> navigator.Navigator:
+	# the board at the top left of the screen, no window wizard needed
+	return navigator.Navigator.at(Vector(0, 0), size, device=navigator.MockDevice(delay))
+
+
+def sequential(trie, spellcast_m, nav: navigator.Navigator, swap_available: int, k: int) -> dict:
+	# what main.py does without the pipeline: the whole search, then the best word
+	started = time.perf_counter()
+	results = solver.TopKSolver(trie, k).solve(spellcast_m, swap_available)
+	if len(results) > 0:
+		nav.navigate(results[0])
+
+	return {"score": results[0].get_total_value() if len(results) > 0 else None, "started": started}
+
+
+def first_move(nav: navigator.Navigator) -> float:
+	return nav.device.events[0][3]
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="time to the first move of the drag, solving and then dragging "
+												 "against the streaming pipeline, on a mock input device")
+	parser.add_argument("--dictionary", default=None,
+						help="word list snapshot (default: words/<default provider>.txt)")
+	parser.add_argument("--profile", choices=list(PROFILES.keys()), default="common")
+	parser.add_argument("--seeds", type=int, default=5)
+	parser.add_argument("--size", type=int, default=5)
+	parser.add_argument("--swap", type=int, default=1)
+	parser.add_argument("--top", type=int, default=100)
+	parser.add_argument("--threshold", type=float, default=None, help="play the first word scoring this much")
+	parser.add_argument("--deadline-ms", type=float, default=None)
+	parser.add_argument("--device-delay-ms", type=float, default=0.0, help="simulated latency of each device call")
+	parser.add_argument("--output", default=None, help="write the results as json")
+	args = parser.parse_args()
+
+	source = args.dictionary
+	if source is None:
+		with open("./word_provider.txt", "r", encoding="utf-8") as f:
+			source = f"./words/{f.read().strip()}.txt"
+
+	delay = args.device_delay_ms / 1000
+	runs = []
+	with tempfile.TemporaryDirectory() as directory:
+		index = os.path.join(directory, "snapshot.idx")
+		dictionary.build(source, index)
+		word_dictionary = dictionary.CompiledDictionary(index)
+		trie = word_dictionary.trie
+
+		for seed in range(args.seeds):
+			spellcast_m = generate_board(args.profile, seed, args.size)
+
+			nav = mock_navigator(args.size, delay)
+			before = sequential(trie, spellcast_m, nav, args.swap, args.top)
+			sequential_ms = (first_move(nav) - before["started"]) * 1000
+
+			nav = mock_navigator(args.size, delay)
+			played = pipeline.run(trie, spellcast_m, nav, args.swap, args.threshold, args.deadline_ms, args.top)
+			if played.chosen is None:
+				LOGGER.warning(f"{args.profile}-{seed}: no word found")
+				continue
+
+			run = dict(played.to_dict(), board=f"{args.profile}-{seed}", sequential_score=before["score"],
+					   sequential_first_move_ms=sequential_ms,
+					   first_move_ms=(first_move(nav) - played.started) * 1000,
+					   # from the solver finding the word to the device moving
+					   move_latency_ms=(first_move(nav) - played.chosen.found) * 1000,
+					   drag_ms=(nav.device.events[-1][3] - first_move(nav)) * 1000)
+			runs.append(run)
+			LOGGER.info(f"{run['board']}: first move after {round(run['first_move_ms'], 2)}ms "
+						f"({round(sequential_ms, 2)}ms sequential), {run['word']} {run['score']} "
+						f"({run['reason']}, best {before['score']}), move latency {round(run['move_latency_ms'], 3)}ms")
+
+		word_dictionary.close()
+
+	if len(runs) > 0:
+		median = lambda key: round(statistics.median(run[key] for run in runs), 3)
+		LOGGER.info(f"median first move {median('first_move_ms')}ms, sequential {median('sequential_first_move_ms')}ms, "
+					f"move latency {median('move_latency_ms')}ms, drag {median('drag_ms')}ms")
+
+	if args.output is not None:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump({"threshold": args.threshold, "deadline_ms": args.deadline_ms, "swap_available": args.swap,
+					   "device_delay_ms": args.device_delay_ms, "runs": runs}, f, indent=4)
+		LOGGER.info(f"Results written to {args.output}")
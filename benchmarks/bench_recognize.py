@@ -0,0 +1,116 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy
+from PIL import Image, ImageDraw, ImageFont
+
+import logger
+import recognize
+from navigator import MockDevice, Navigator
+from spellcast import LETTERS, Vector
+
+LOGGER = logger.Logger("Recognize Benchmark")
+
+MARGIN = 20
+
+
+def random_cells(rng: random.Random, size: int) -> list[str]:
+	cells = []
+	for _ in range(size * size):
+		badge = rng.choice([""] * 12 + [" 2", " 3", " 1 true"])
+		cells.append(rng.choice(LETTERS) + badge)
+
+	return cells
+
+
+def training_cells(offset: int, size: int) -> list[str]:
+	# every letter and badge shows up over a few boards
+	badges = ["", " 2", "", " 3", "", " 1 true"]
+	return [LETTERS[(offset + index) % len(LETTERS)] + badges[(offset + index) % len(badges)]
+			for index in range(size * size)]
+
+
+def render(nav: Navigator, cells: list[str], rng: random.Random, noise: float) -> Image.Image:
+	# a synthetic screenshot: light tiles on a dark table, the letter in the middle, the badge in the top left
+	size = nav.board_size
+	right, bottom, width, height = nav.get_region(size - 1, size - 1)
+	image = Image.new("RGB", (int(right + width) + MARGIN, int(bottom + height) + MARGIN), (40, 30, 60))
+	draw = ImageDraw.Draw(image)
+	letter_font = ImageFont.load_default(size=int(nav.button_size * 0.55))
+	badge_font = ImageFont.load_default(size=int(nav.button_size * 0.18))
+
+	for index, text in enumerate(cells):
+		x, y, w, h = nav.get_region(index % size, index // size)
+		draw.rounded_rectangle([x, y, x + w, y + h], radius=w * 0.15, fill=(235, 225, 205))
+		parts = text.split()
+		draw.text((x + w / 2, y + h / 2), parts[0].upper(), fill=(20, 20, 20), font=letter_font, anchor="mm")
+
+		badge = recognize.badge_label(text)
+		if badge != recognize.NO_BADGE:
+			color = {"2": (60, 140, 220), "3": (220, 120, 40), "double": (200, 40, 160)}[badge]
+			draw.ellipse([x + w * 0.02, y + h * 0.02, x + w * 0.3, y + h * 0.3], fill=color)
+			draw.text((x + w * 0.16, y + h * 0.16), {"2": "2", "3": "3", "double": "x2"}[badge], fill=(255, 255, 255),
+					  font=badge_font, anchor="mm")
+
+	if noise > 0:
+		pixels = numpy.asarray(image, dtype=numpy.float32)
+		pixels = pixels + numpy.random.default_rng(rng.randrange(1 << 30)).normal(0, noise, pixels.shape)
+		image = Image.fromarray(numpy.clip(pixels, 0, 255).astype(numpy.uint8))
+
+	return image
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="board recognition accuracy and speed on synthetic screenshots")
+	parser.add_argument("--size", type=int, default=5)
+	parser.add_argument("--boards", type=int, default=20)
+	parser.add_argument("--noise", type=float, default=8.0, help="gaussian pixel noise")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--fixtures", default=None, metavar="DIR",
+						help="also save the boards as screenshot fixtures (<n>.png, <n>.txt) and their templates")
+	args = parser.parse_args()
+
+	rng = random.Random(args.seed)
+	nav = Navigator.at(Vector(MARGIN, MARGIN), args.size, device=MockDevice())
+	origin = Vector(0, 0)
+	regions = recognize.cell_regions(nav, origin)
+
+	templates = recognize.Templates()
+	for offset in range(0, len(LETTERS) * 2, 3):
+		cells = training_cells(offset, args.size)
+		image = render(nav, cells, rng, args.noise)
+		recognize.learn(templates, recognize.grayscale(image), regions, cells)
+
+	timings = []
+	wrong = 0
+	uncertain = 0
+	for board in range(args.boards):
+		cells = random_cells(rng, args.size)
+		image = render(nav, cells, rng, args.noise)
+		if args.fixtures is not None:
+			os.makedirs(args.fixtures, exist_ok=True)
+			image.save(os.path.join(args.fixtures, f"{board}.png"))
+			with open(os.path.join(args.fixtures, f"{board}.txt"), "w", encoding="utf-8") as f:
+				f.write("\n".join(cells) + "\n")
+
+		start = time.perf_counter()
+		found, confidence = recognize.classify(templates, recognize.grayscale(image), regions)
+		timings.append(time.perf_counter() - start)
+
+		wrong += sum(1 for cell, other in zip(found, cells) if cell != other)
+		uncertain += int((confidence < recognize.MIN_SCORE).sum())
+
+	if args.fixtures is not None:
+		templates.save(os.path.join(args.fixtures, "glyphs.npz"))
+		LOGGER.info(f"Fixtures written to {args.fixtures}, check one with python3 recognize.py read "
+					f"{args.fixtures}/0.png {args.fixtures}/0.txt --origin {MARGIN} {MARGIN} --templates {args.fixtures}/glyphs.npz")
+
+	cells = args.boards * args.size * args.size
+	LOGGER.info(f"{cells - wrong}/{cells} cells read right, {uncertain} uncertain, median "
+				f"{round(statistics.median(timings) * 1000, 3)}ms per board (max {round(max(timings) * 1000, 3)}ms)")
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dictionary
+import logger
+import solver
+from bench_solver import PROFILES, generate_board
+
+LOGGER = logger.Logger("Scaling Benchmark")
+
+ENGINES = ["trie", "top"]
+
+
+def sample_dictionary(source: str, fraction: float, target: str) -> int:
+	# a fixed share of the snapshot, the same words for the same fraction on every run
+	with open(source, "r", encoding="utf-8") as f:
+		words = [line.strip() for line in f if line.strip() != ""]
+
+	if fraction < 1.0:
+		words = sorted(random.Random(f"scaling-{fraction}").sample(words, int(len(words) * fraction)))
+
+	with open(target, "w", encoding="utf-8") as f:
+		f.write("\n".join(words) + "\n")
+
+	return len(words)
+
+
+def solve(engine: str, trie, spellcast_m, swap_available: int, top: int) -> list:
+	if engine == "trie":
+		return solver.TrieSolver(trie).solve(spellcast_m, swap_available)
+	return solver.solve(spellcast_m, trie, top, swap_available)
+
+
+def run(engine: str, trie, spellcast_m, swap_available: int, top: int) -> tuple[float, int, int]:
+	# seconds, peak traced bytes and words found of one solve. Memory is traced on a second solve, tracing slows it down
+	start = time.perf_counter()
+	found = solve(engine, trie, spellcast_m, swap_available, top)
+	elapsed = time.perf_counter() - start
+
+	tracemalloc.start()
+	solve(engine, trie, spellcast_m, swap_available, top)
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return elapsed, peak, len(found)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="solver time and memory over board sizes and dictionary sizes")
+	parser.add_argument("--dictionary", default=None,
+						help="word list snapshot to sample from (default: words/<default provider>.txt)")
+	parser.add_argument("--sizes", nargs="+", type=int, default=[5, 8, 12, 16, 20])
+	parser.add_argument("--fractions", nargs="+", type=float, default=[0.25, 0.5, 1.0],
+						help="shares of the dictionary to index")
+	parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+	parser.add_argument("--profile", choices=list(PROFILES.keys()), default="common")
+	parser.add_argument("--seeds", type=int, default=2, help="boards per size")
+	parser.add_argument("--swap", type=int, default=0)
+	parser.add_argument("--top", type=int, default=100, help="k of the top engine")
+	parser.add_argument("--output", default=None, help="write the results as json")
+	args = parser.parse_args()
+
+	source = args.dictionary
+	if source is None:
+		with open("./word_provider.txt", "r", encoding="utf-8") as f:
+			source = f"./words/{f.read().strip()}.txt"
+
+	results = []
+	with tempfile.TemporaryDirectory() as directory:
+		for fraction in args.fractions:
+			words = os.path.join(directory, "words.txt")
+			index = os.path.join(directory, f"{fraction}.idx")
+			word_count = sample_dictionary(source, fraction, words)
+			dictionary.build(words, index)
+			word_dictionary = dictionary.CompiledDictionary(index)
+
+			for size in args.sizes:
+				boards = [generate_board(args.profile, seed, size) for seed in range(args.seeds)]
+				for engine in args.engines:
+					runs = [run(engine, word_dictionary.trie, spellcast_m, args.swap, args.top) for spellcast_m in boards]
+					result = {
+						"engine": engine,
+						"size": size,
+						"cells": size * size,
+						"words": word_count,
+						"seconds": max(elapsed for elapsed, _, _ in runs),
+						"peak_traced_bytes": max(peak for _, peak, _ in runs),
+						"found": sum(found for _, _, found in runs) / len(runs),
+					}
+					results.append(result)
+					LOGGER.info(f"{engine} {size}x{size}, {word_count} words: {round(result['seconds'] * 1000, 2)}ms, "
+								f"peak traced {round(result['peak_traced_bytes'] / 1024 / 1024, 2)}MB, "
+								f"{round(result['found'])} words found")
+
+			word_dictionary.close()
+
+	if args.output is not None:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump({"swap_available": args.swap, "top": args.top, "profile": args.profile, "runs": results}, f,
+					  indent=4)
+		LOGGER.info(f"Results written to {args.output}")
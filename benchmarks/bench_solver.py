@@ -0,0 +1,277 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+	import resource
+except ImportError:  # not available on windows
+	resource = None
+
+import dictionary
+import exhaustive
+import logger
+import prefilter
+import solver
+from spellcast import *
+from wizard import SpellCastCharFactory, find_selection
+
+LOGGER = logger.Logger("Solver Benchmark")
+
+FORMAT = 1
+
+# letter pools the boards are drawn from, the same letter can appear several times to weight it
+PROFILES = {
+	"common": "eeeeeeaaaaiiiioooonnnrrrssstttlllcdmupbghfwy",
+	"vowel-poor": "eaionnrrssttllccddmmppbbgghhffkwyv",
+	"rare": "eeaaiioonrstlcdmupbghfkwyvjqxz",
+}
+
+BOARD_ENGINES = ["trie", "top"]
+WORD_ENGINES = ["exhaustive", "wizard"]
+
+
+def generate_board(profile: str, seed: int, size: int = 5) -> SpellCastMap:
+	# one double points cell and a few letter multipliers, like a real round
+	rng = random.Random(f"{profile}-{seed}")
+	factory = SpellCastCharFactory()
+	letters = PROFILES[profile]
+	double = rng.randrange(size * size)
+
+	spellcast_m = SpellCastMap(size)
+	for index in range(size * size):
+		multiplier = rng.choice([1.0] * 10 + [2.0, 2.0, 3.0])
+		char = factory.get(Vector(index % size, index // size), SingleChar(rng.choice(letters)), multiplier,
+						   index == double)
+		spellcast_m.set(char)
+	spellcast_m.generate_map_by_char()
+
+	return spellcast_m
+
+
+def board_text(spellcast_m: SpellCastMap) -> str:
+	return "".join(char.c.char for char in spellcast_m.board.cells)
+
+
+def file_hash(path: str) -> str:
+	digest = hashlib.sha256()
+	with open(path, "rb") as f:
+		for block in iter(lambda: f.read(1024 * 1024), b""):
+			digest.update(block)
+
+	return digest.hexdigest()
+
+
+def percentile(samples: list[float], p: float) -> float:
+	if len(samples) == 0:
+		return 0.0
+
+	ordered = sorted(samples)
+	return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss() -> int:
+	# bytes, ru_maxrss is in kilobytes on linux and in bytes on macos
+	if resource is None:
+		return 0
+
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss if sys.platform == "darwin" else rss * 1024
+
+
+def sample_words(word_dictionary: dictionary.CompiledDictionary, word_filter: prefilter.Prefilter,
+				 spellcast_m: SpellCastMap, swap_available: int, limit: int) -> list[str]:
+	# per word engines only get words that pass the prefilter, spread evenly over the survivors
+	survivors = word_filter.survivors(spellcast_m, swap_available)
+	step = max(1, len(survivors) // limit) if limit > 0 else 1
+	return [word_dictionary.words[int(word_id)] for word_id in survivors[::step][:limit or None]]
+
+
+def run_engine(engine: str, spellcast_m: SpellCastMap, word_dictionary: dictionary.CompiledDictionary,
+			   words: list[str], swap_available: int, top: int) -> tuple[list[float], int]:
+	# latency samples (one per board for board engines, one per word for word engines) and words found
+	if engine == "trie":
+		start = time.perf_counter()
+		found = solver.TrieSolver(word_dictionary.trie).solve(spellcast_m, swap_available)
+		return [time.perf_counter() - start], len(found)
+
+	if engine == "top":
+		start = time.perf_counter()
+		found = solver.solve(spellcast_m, word_dictionary.trie, top, swap_available)
+		return [time.perf_counter() - start], len(found)
+
+	samples = []
+	found = 0
+	for word in words:
+		start = time.perf_counter()
+		if engine == "exhaustive":
+			found += len(exhaustive.find_selection_exhaustive(spellcast_m, [word], swap_available))
+		else:
+			found += len([wizard for wizard in find_selection(spellcast_m, [word], swap_available) if wizard.success])
+		samples.append(time.perf_counter() - start)
+
+	return samples, found
+
+
+def bench(engine: str, boards: list[tuple[str, int, SpellCastMap]], word_dictionary: dictionary.CompiledDictionary,
+		  word_filter: prefilter.Prefilter, swap_available: int, word_limit: int, top: int, repeat: int) -> dict:
+	per_board = {}
+	samples = []
+	units = 0
+	elapsed = 0.0
+
+	board_words = []
+	for profile, seed, spellcast_m in boards:
+		words = []
+		if engine in WORD_ENGINES:
+			words = sample_words(word_dictionary, word_filter, spellcast_m, swap_available, word_limit)
+		board_words.append(words)
+
+	for (profile, seed, spellcast_m), words in zip(boards, board_words):
+		best = None
+		found = 0
+		for _ in range(repeat):
+			board_samples, found = run_engine(engine, spellcast_m, word_dictionary, words, swap_available, top)
+			if best is None or sum(board_samples) < sum(best):
+				best = board_samples
+
+		samples.extend(best)
+		units += len(best)
+		elapsed += sum(best)
+		per_board[f"{profile}-{seed}"] = {"seconds": sum(best), "found": found, "words": len(words)}
+
+	# allocations of one more pass over every board, kept apart so tracing does not skew the timings
+	tracemalloc.start()
+	for (profile, seed, spellcast_m), words in zip(boards, board_words):
+		run_engine(engine, spellcast_m, word_dictionary, words, swap_available, top)
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return {
+		"unit": "word" if engine in WORD_ENGINES else "board",
+		"seconds": elapsed,
+		"throughput": units / elapsed if elapsed > 0 else 0.0,
+		"latency_ms": {f"p{p}": percentile(samples, p) * 1000 for p in [50, 90, 99]},
+		"peak_traced_bytes": peak,
+		"boards": per_board,
+	}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+	# a slower engine or a changed found count is a regression, a different setup makes the runs incomparable
+	if baseline.get("format") != FORMAT:
+		raise Exception(f"baseline format {baseline.get('format')} is not {FORMAT}")
+
+	for key in ["dictionary_sha256", "boards", "swap_available", "word_limit", "top"]:
+		if baseline.get(key) != results.get(key):
+			raise Exception(f"baseline was recorded with a different {key}, results are not comparable")
+
+	regressions = []
+	for engine, current in results["engines"].items():
+		if engine not in baseline["engines"]:
+			continue
+
+		before = baseline["engines"][engine]
+		if current["throughput"] < before["throughput"] * (1.0 - tolerance):
+			regressions.append(f"{engine}: throughput {round(before['throughput'], 2)} -> "
+							   f"{round(current['throughput'], 2)} {current['unit']}s/s")
+
+		for p, latency in current["latency_ms"].items():
+			if latency > before["latency_ms"][p] * (1.0 + tolerance):
+				regressions.append(f"{engine}: {p} latency {round(before['latency_ms'][p], 3)}ms -> "
+								   f"{round(latency, 3)}ms")
+
+		for board, run in current["boards"].items():
+			if run["found"] != before["boards"][board]["found"]:
+				regressions.append(f"{engine}: {board} found {before['boards'][board]['found']} -> {run['found']} words")
+
+	return regressions
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="solver throughput and latency on fixed seeded boards")
+	parser.add_argument("--dictionary", default=None,
+						help="word list snapshot to benchmark against (default: words/<default provider>.txt)")
+	parser.add_argument("--engines", nargs="+", choices=BOARD_ENGINES + WORD_ENGINES, default=["trie", "top", "exhaustive"])
+	parser.add_argument("--profiles", nargs="+", choices=list(PROFILES.keys()), default=list(PROFILES.keys()))
+	parser.add_argument("--seeds", type=int, default=3, help="boards per profile")
+	parser.add_argument("--size", type=int, default=5, help="board side length")
+	parser.add_argument("--swap", type=int, default=1)
+	parser.add_argument("--word-limit", type=int, default=200, help="words per board for the per word engines")
+	parser.add_argument("--top", type=int, default=100, help="k of the top engine")
+	parser.add_argument("--repeat", type=int, default=3, help="runs per board, the fastest is kept")
+	parser.add_argument("--output", default=None, help="write the results as json")
+	parser.add_argument("--compare", default=None, metavar="BASELINE", help="flag regressions against a results json")
+	parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown before a regression")
+	args = parser.parse_args()
+
+	source = args.dictionary
+	if source is None:
+		with open("./word_provider.txt", "r", encoding="utf-8") as f:
+			source = f"./words/{f.read().strip()}.txt"
+
+	boards = [(profile, seed, generate_board(profile, seed, args.size)) for profile in args.profiles for seed in range(args.seeds)]
+
+	with tempfile.TemporaryDirectory() as directory:
+		# compiled fresh from the snapshot so a stale index never leaks into the numbers
+		index = os.path.join(directory, "snapshot.idx")
+		dictionary.build(source, index)
+		word_dictionary = dictionary.CompiledDictionary(index)
+		word_filter = prefilter.Prefilter.from_dictionary(word_dictionary)
+		LOGGER.info(f"{word_dictionary.word_count()} words from {source}, {len(boards)} boards")
+
+		results = {
+			"format": FORMAT,
+			"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"python": platform.python_version(),
+			"machine": platform.machine(),
+			"dictionary_sha256": file_hash(source),
+			"boards": {f"{profile}-{seed}": board_text(spellcast_m) for profile, seed, spellcast_m in boards},
+			"size": args.size,
+			"swap_available": args.swap,
+			"word_limit": args.word_limit,
+			"top": args.top,
+			"engines": {},
+		}
+
+		for engine in args.engines:
+			result = bench(engine, boards, word_dictionary, word_filter, args.swap, args.word_limit, args.top,
+						   args.repeat)
+			results["engines"][engine] = result
+			latency = ", ".join(f"{p} {round(value, 3)}ms" for p, value in result["latency_ms"].items())
+			LOGGER.info(f"{engine}: {round(result['throughput'], 2)} {result['unit']}s/s, {latency}, "
+						f"peak traced {round(result['peak_traced_bytes'] / 1024 / 1024, 2)}MB")
+
+		if "trie" in results["engines"] and "top" in results["engines"]:
+			speedup = results["engines"]["top"]["throughput"] / results["engines"]["trie"]["throughput"]
+			LOGGER.info(f"top {args.top}: {round(speedup, 2)}x the throughput of the full trie solve")
+
+		# ru_maxrss never goes down, only the whole run has a peak, the engines have their traced peaks
+		results["peak_rss_bytes"] = peak_rss()
+		LOGGER.info(f"Peak RSS of the run: {round(results['peak_rss_bytes'] / 1024 / 1024, 2)}MB")
+		word_dictionary.close()
+
+	if args.output is not None:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump(results, f, indent=4)
+		LOGGER.info(f"Results written to {args.output}")
+
+	if args.compare is not None:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			regressions = compare(results, json.load(f), args.tolerance)
+
+		for regression in regressions:
+			LOGGER.warning(regression)
+
+		if len(regressions) > 0:
+			sys.exit(1)
+
+		LOGGER.info(f"No regressions against {args.compare}")
@@ -0,0 +1,73 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger
+
+LOGGER = logger.Logger("Startup Benchmark")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what a fresh interpreter has to import, the gui stack is what main.py used to import before solving anything
+CASES = {
+	"interpreter": "pass",
+	"solver core": "import spellcast, trie, solver, dictionary, word_provider",
+	"main": "import main",
+	"gui stack": "import navigator, window, PIL.Image, tqdm, concurrent.futures",
+}
+
+
+def measure(code: str, runs: int) -> tuple[list[float], str]:
+	# wall clock of whole interpreter runs, the error of the first failing run if the imports fail
+	samples = []
+	for _ in range(runs):
+		start = time.perf_counter()
+		process = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+		elapsed = time.perf_counter() - start
+		if process.returncode != 0:
+			return samples, process.stderr.strip().split("\n")[-1]
+		samples.append(elapsed)
+
+	return samples, ""
+
+
+def slowest_imports(code: str, count: int) -> list[tuple[int, str]]:
+	# cumulative microseconds of the modules imported directly by code (or by the module it imports), from -X importtime
+	process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+	imports = []
+	for line in process.stderr.split("\n"):
+		if not line.startswith("import time:") or "|" not in line:
+			continue
+		parts = line[len("import time:"):].split("|")
+		if not parts[1].strip().isdigit():
+			continue
+		# nesting is shown as two spaces per level
+		if (len(parts[2]) - len(parts[2].lstrip()) - 1) // 2 == 1:
+			imports.append((int(parts[1]), parts[2].strip()))
+
+	return sorted(imports, reverse=True)[:count]
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="interpreter startup and import time of the solver and the gui stack")
+	parser.add_argument("--runs", type=int, default=10)
+	parser.add_argument("--slowest", type=int, default=0, metavar="N", help="also list the N slowest imports of main")
+	args = parser.parse_args()
+
+	for name, code in CASES.items():
+		samples, error = measure(code, args.runs)
+		if error != "":
+			LOGGER.warning(f"{name}: can not be imported here ({error})")
+			continue
+
+		LOGGER.info(f"{name}: median {round(statistics.median(samples) * 1000, 1)}ms, "
+					f"min {round(min(samples) * 1000, 1)}ms over {len(samples)} runs")
+
+	if args.slowest > 0:
+		for microseconds, module in slowest_imports(CASES["main"], args.slowest):
+			LOGGER.info(f"{module}: {round(microseconds / 1000, 1)}ms")
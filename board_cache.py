@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import typing
+
+import logger
+from spellcast import *
+
+LOGGER = logger.Logger("Board Cache")
+
+DEFAULT_PATH = "./results.db"
+CAPACITY = 10000  # boards kept before the least recently used ones are evicted
+BUSY_TIMEOUT = 30.0  # seconds a process waits for another one's write
+
+SCHEMA = [
+	"CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, record TEXT NOT NULL, used REAL NOT NULL)",
+	"CREATE INDEX IF NOT EXISTS results_used ON results (used)",
+	"CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+
+def board_key(spellcast_m: SpellCastMap, fingerprint: str, options: dict) -> str:
+	# letters, multipliers and the double points cell in x, y order, the dictionary artifact and the solver options
+	cells = []
+	for y in range(spellcast_m.size):
+		for x in range(spellcast_m.size):
+			c = spellcast_m.get_at(x, y)
+			cells.append([c.c.char, float(c.multiplier), bool(c.mark_double)])
+
+	canonical = json.dumps({"size": spellcast_m.size, "cells": cells, "dictionary": fingerprint, "options": options},
+						   sort_keys=True, separators=(",", ":"))
+	return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class BoardCache:
+	# solved boards in a sqlite file, shared by every process that opens it. WAL lets readers go on while one writes
+	path: str
+	capacity: int
+	hits: int
+	misses: int
+
+	def __init__(self, path: str = DEFAULT_PATH, capacity: int = CAPACITY):
+		self.path = path
+		self.capacity = capacity
+		self.hits = 0
+		self.misses = 0
+		# one connection per cache, the daemon's solver threads take turns on it
+		self.lock = threading.Lock()
+		self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("PRAGMA synchronous=NORMAL")
+		with self.transaction():
+			for statement in SCHEMA:
+				self.connection.execute(statement)
+
+	def transaction(self, mode: str = "IMMEDIATE"):
+		return Transaction(self, mode)
+
+	def count(self, name: str):
+		self.connection.execute("INSERT INTO counters (name, value) VALUES (?, 1) "
+								"ON CONFLICT (name) DO UPDATE SET value = value + 1", (name,))
+
+	def get(self, key: str) -> typing.Union[dict, None]:
+		# the lookup only reads, readers never wait for each other or for a writer. The write lock is taken
+		# afterwards for the counters and the recency of a hit
+		with self.transaction("DEFERRED"):
+			row = self.connection.execute("SELECT record FROM results WHERE key = ?", (key,)).fetchone()
+
+		with self.transaction():
+			if row is None:
+				self.count("misses")
+			else:
+				self.connection.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+				self.count("hits")
+
+		if row is None:
+			self.misses += 1
+			return None
+
+		self.hits += 1
+		return json.loads(row[0])
+
+	def put(self, key: str, record: dict):
+		if self.capacity <= 0:
+			return
+
+		with self.transaction():
+			self.connection.execute("INSERT OR REPLACE INTO results (key, record, used) VALUES (?, ?, ?)",
+									(key, json.dumps(record), time.time()))
+			evicted = self.connection.execute(
+				"DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+				(self.capacity,)).rowcount
+			if evicted > 0:
+				self.connection.execute("INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+										"ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (evicted,))
+
+	def clear(self):
+		with self.transaction():
+			self.connection.execute("DELETE FROM results")
+			self.connection.execute("DELETE FROM counters")
+		self.connection.execute("VACUUM")
+
+	def to_dict(self) -> dict:
+		# hits and misses of this process, the totals are shared by everyone using the file
+		with self.transaction("DEFERRED"):
+			size = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+			totals = dict(self.connection.execute("SELECT name, value FROM counters").fetchall())
+
+		lookups = self.hits + self.misses
+		total_lookups = totals.get("hits", 0) + totals.get("misses", 0)
+		return {
+			"path": self.path,
+			"size": size,
+			"capacity": self.capacity,
+			"bytes": os.path.getsize(self.path),
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": self.hits / lookups if lookups > 0 else None,
+			"total_hits": totals.get("hits", 0),
+			"total_misses": totals.get("misses", 0),
+			"total_hit_rate": totals.get("hits", 0) / total_lookups if total_lookups > 0 else None,
+			"evictions": totals.get("evictions", 0),
+		}
+
+	def close(self):
+		self.connection.close()
+
+
+class Transaction:
+	# DEFERRED for reads. Writes take the write lock up front with IMMEDIATE, a read transaction that later writes
+	# can fail when another process wrote in between, a waiting IMMEDIATE one just waits its turn
+	cache: BoardCache
+	mode: str
+
+	def __init__(self, cache: BoardCache, mode: str = "IMMEDIATE"):
+		self.cache = cache
+		self.mode = mode
+
+	def __enter__(self):
+		self.cache.lock.acquire()
+		try:
+			self.cache.connection.execute(f"BEGIN {self.mode}")
+		except Exception:
+			self.cache.lock.release()
+			raise
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		try:
+			self.cache.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+		finally:
+			self.cache.lock.release()
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="show or clear the solved board cache")
+	parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+	parser.add_argument("--clear", action="store_true")
+	args = parser.parse_args()
+
+	if not os.path.exists(args.path):
+		LOGGER.warning(f"no board cache at {args.path}")
+		sys.exit(1)
+
+	cache = BoardCache(args.path)
+	if args.clear:
+		cache.clear()
+		LOGGER.info(f"Cleared {args.path}")
+	print(json.dumps(cache.to_dict(), indent=4))
+	cache.close()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import sys
+import time
+import typing
+import urllib.error
+import urllib.request
+
+import crayons
+
+import batch
+import logger
+import protocol
+from spellcast import *
+
+LOGGER = logger.Logger("Client")
+
+
+def request(url: str, payload: typing.Union[dict, None] = None, timeout: float = protocol.REQUEST_TIMEOUT) -> dict:
+	data = None if payload is None else json.dumps(payload).encode("utf-8")
+	req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+	try:
+		with urllib.request.urlopen(req, timeout=timeout + 5) as response:
+			return json.loads(response.read())
+	except urllib.error.HTTPError as e:
+		raise Exception(f"daemon answered {e.code}: {json.loads(e.read()).get('error')}")
+	except urllib.error.URLError as e:
+		raise Exception(f"no daemon at {url} ({e.reason}), start it with python3 daemon.py")
+
+
+def prompt_cells(size: int = 5) -> list[str]:
+	cells = []
+	for y in range(size):
+		for x in range(size):
+			while True:
+				data = input(f"({x}, {y}): ")
+				try:
+					batch.parse_cell(data)
+				except Exception as e:
+					sys.stdout.write(f"\r{e}. ")
+					continue
+				break
+
+			cells.append(data)
+
+	return cells
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="SpellcastHelper client for the solver daemon")
+	parser.add_argument("swap_available", nargs="?", type=int, default=1)
+	parser.add_argument("--url", default=f"http://{protocol.DEFAULT_HOST}:{protocol.DEFAULT_PORT}")
+	parser.add_argument("--engine", choices=protocol.ENGINES, default="trie")
+	parser.add_argument("--top", type=int, default=None, metavar="K")
+	parser.add_argument("--limit", type=int, default=protocol.RESULT_LIMIT)
+	parser.add_argument("--timeout", type=float, default=protocol.REQUEST_TIMEOUT)
+	parser.add_argument("--size", type=int, default=5, help="board side length")
+	parser.add_argument("--navigate", action="store_true", help="drag the results on the game window")
+	parser.add_argument("--batch", default=None, metavar="FILE", help="send every board of FILE (- for stdin)")
+	parser.add_argument("--stats", action="store_true", help="print the daemon statistics")
+	args = parser.parse_args()
+
+	def solve(cells: list[str]) -> dict:
+		return request(args.url + protocol.SOLVE_PATH, {
+			"cells": cells,
+			"size": batch.board_size(cells),
+			"swap": args.swap_available,
+			"engine": args.engine,
+			"top": args.top,
+			"limit": args.limit,
+			"timeout": args.timeout,
+		}, args.timeout)
+
+	try:
+		if args.stats:
+			print(json.dumps(request(args.url + protocol.STATS_PATH), indent=4))
+		elif args.batch is not None:
+			source = sys.stdin if args.batch == "-" else open(args.batch, "r", encoding="utf-8")
+			for board, (line, cells) in enumerate(batch.read_records(source)):
+				try:
+					record = dict(solve(cells), board=board)
+				except Exception as e:
+					record = {"board": board, "line": line, "error": str(e)}
+				print(json.dumps(record), flush=True)
+		else:
+			if args.navigate:
+				import navigator
+				import window
+				nav = navigator.Navigator(window.load_default(), args.size)
+
+			LOGGER.info("Please input spellcast map")
+			cells = prompt_cells(args.size)
+			spellcast = batch.parse_board(cells, args.size)
+
+			start = time.time()
+			record = solve(cells)
+			LOGGER.info(f"Takes {round(time.time() - start, 3)}s{' (cached)' if record.get('cached') else ''}")
+			LOGGER.info(f"Found {record['found']} words.")
+
+			for result in record["results"]:
+				result_word = batch.record_selection(spellcast, result)
+				print(
+					result_word.get_text() + f": {crayons.magenta(result_word.get_total_value(), bold=True)} " + result_word.get_text_vectors())
+
+				if args.navigate:
+					nav.navigate(result_word)
+					time.sleep(3)
+	except Exception as e:
+		LOGGER.warning(str(e))
+		sys.exit(1)
@@ -0,0 +1,364 @@
+import argparse
+import bisect
+import collections
+import http.server
+import json
+import queue
+import threading
+import time
+import typing
+
+import batch
+import board_cache
+import logger
+import parallel
+import prefilter
+import protocol
+import word_provider
+from dictionary import CompiledDictionary
+from spellcast import *
+
+LOGGER = logger.Logger("Daemon")
+
+QUEUE_SIZE = 32
+CACHE_SIZE = 256
+
+# upper bounds of the latency buckets in milliseconds, the last bucket takes everything slower
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+	counts: list[int]
+	total: float
+	count: int
+	slowest: float
+
+	def __init__(self):
+		self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+		self.total = 0.0
+		self.count = 0
+		self.slowest = 0.0
+
+	def observe(self, seconds: float):
+		self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds * 1000)] += 1
+		self.total += seconds
+		self.count += 1
+		self.slowest = max(self.slowest, seconds)
+
+	def percentile(self, p: float) -> typing.Union[float, None]:
+		# upper bound of the bucket the p-th percentile falls in, the slowest request for the last bucket
+		if self.count == 0:
+			return None
+
+		rank = p / 100 * self.count
+		seen = 0
+		for index, count in enumerate(self.counts):
+			seen += count
+			if seen >= rank and count > 0:
+				return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.slowest * 1000
+
+		return None
+
+	def to_dict(self) -> dict:
+		labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}ms"]
+		return {
+			"count": self.count,
+			"mean_ms": self.total / self.count * 1000 if self.count > 0 else None,
+			"p50_ms": self.percentile(50),
+			"p90_ms": self.percentile(90),
+			"p99_ms": self.percentile(99),
+			"max_ms": self.slowest * 1000,
+			"buckets": dict(zip(labels, self.counts)),
+		}
+
+
+class ResultCache:
+	# least recently used board results, a repeated board is answered without solving
+	size: int
+	entries: collections.OrderedDict
+	hits: int
+	misses: int
+
+	def __init__(self, size: int):
+		self.size = size
+		self.entries = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key) -> typing.Union[dict, None]:
+		if key in self.entries:
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return self.entries[key]
+
+		self.misses += 1
+		return None
+
+	def put(self, key, record: dict):
+		if self.size <= 0:
+			return
+
+		self.entries[key] = record
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.size:
+			self.entries.popitem(last=False)
+
+	def to_dict(self) -> dict:
+		lookups = self.hits + self.misses
+		return {
+			"size": len(self.entries),
+			"capacity": self.size,
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": self.hits / lookups if lookups > 0 else None,
+		}
+
+
+class Job:
+	spellcast_m: SpellCastMap
+	engine: str
+	swap_available: int
+	top: typing.Union[int, None]
+	limit: int
+	done: threading.Event
+	record: typing.Union[dict, None]
+	error: typing.Union[str, None]
+	cancelled: bool
+	created: float
+
+	def __init__(self, spellcast_m: SpellCastMap, engine: str, swap_available: int, top: typing.Union[int, None],
+				 limit: int):
+		self.spellcast_m = spellcast_m
+		self.engine = engine
+		self.swap_available = swap_available
+		self.top = top
+		self.limit = limit
+		self.done = threading.Event()
+		self.record = None
+		self.error = None
+		self.cancelled = False
+		self.created = time.perf_counter()
+
+	def key(self) -> tuple:
+		return parallel.encode_board(self.spellcast_m), self.engine, self.swap_available, self.top, self.limit
+
+	def disk_key(self, word_dictionary: CompiledDictionary) -> str:
+		return batch.cache_key(self.spellcast_m, word_dictionary, self.engine, self.swap_available, self.top, self.limit)
+
+
+class SolverService:
+	word_dictionary: CompiledDictionary
+	jobs: queue.Queue
+	cache: ResultCache
+	disk_cache: typing.Union[board_cache.BoardCache, None]
+	latency: LatencyHistogram
+	solve_latency: LatencyHistogram
+
+	def __init__(self, word_dictionary: CompiledDictionary, queue_size: int = QUEUE_SIZE, threads: int = 1,
+				 cache_size: int = CACHE_SIZE, disk_cache: typing.Union[board_cache.BoardCache, None] = None):
+		self.word_dictionary = word_dictionary
+		self.word_filter = None
+		self.jobs = queue.Queue(maxsize=queue_size)
+		self.cache = ResultCache(cache_size)
+		# behind the memory cache, shared with other daemons and batch runs and kept across restarts
+		self.disk_cache = disk_cache
+		self.latency = LatencyHistogram()
+		self.solve_latency = LatencyHistogram()
+		self.lock = threading.Lock()
+		self.started = time.time()
+		self.counters = {"requests": 0, "solved": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+
+		for _ in range(threads):
+			threading.Thread(target=self.work, daemon=True).start()
+
+	def count(self, name: str):
+		with self.lock:
+			self.counters[name] += 1
+
+	def prefilter(self) -> prefilter.Prefilter:
+		with self.lock:
+			if self.word_filter is None:
+				self.word_filter = prefilter.Prefilter.from_dictionary(self.word_dictionary)
+			return self.word_filter
+
+	def submit(self, job: Job, timeout: float) -> dict:
+		# raises queue.Full when the queue is full and TimeoutError when the result did not come in time
+		self.count("requests")
+		with self.lock:
+			record = self.cache.get(job.key())
+		if record is None and self.disk_cache is not None:
+			record = self.disk_cache.get(job.disk_key(self.word_dictionary))
+			if record is not None:
+				with self.lock:
+					self.cache.put(job.key(), record)
+		if record is not None:
+			with self.lock:
+				self.latency.observe(time.perf_counter() - job.created)
+			return dict(record, cached=True)
+
+		try:
+			self.jobs.put_nowait(job)
+		except queue.Full:
+			self.count("rejected")
+			raise
+
+		if not job.done.wait(timeout):
+			# a running solve cannot be interrupted, its result is dropped. a queued one is skipped
+			job.cancelled = True
+			self.count("timeouts")
+			raise TimeoutError(f"no result within {timeout}s")
+
+		if job.error is not None:
+			raise Exception(job.error)
+
+		with self.lock:
+			self.latency.observe(time.perf_counter() - job.created)
+		return dict(job.record, cached=False)
+
+	def work(self):
+		while True:
+			job = self.jobs.get()
+			if job.cancelled:
+				continue
+
+			try:
+				start = time.perf_counter()
+				word_filter = self.prefilter() if job.engine != "trie" else None
+				selections = batch.solve(job.spellcast_m, self.word_dictionary, job.engine, job.swap_available,
+										 job.top, word_filter)
+				elapsed = time.perf_counter() - start
+				job.record = batch.board_record(0, selections, elapsed, job.limit)
+
+				with self.lock:
+					self.solve_latency.observe(elapsed)
+					self.cache.put(job.key(), job.record)
+				if self.disk_cache is not None:
+					self.disk_cache.put(job.disk_key(self.word_dictionary), job.record)
+				self.count("solved")
+			except Exception as e:
+				job.error = str(e)
+				self.count("errors")
+			finally:
+				job.done.set()
+
+	def stats(self) -> dict:
+		with self.lock:
+			return {
+				"uptime": round(time.time() - self.started, 3),
+				"words": self.word_dictionary.word_count(),
+				"queue": {"size": self.jobs.qsize(), "capacity": self.jobs.maxsize},
+				"counters": dict(self.counters),
+				"latency": self.latency.to_dict(),
+				"solve_latency": self.solve_latency.to_dict(),
+				"cache": self.cache.to_dict(),
+				"disk_cache": None if self.disk_cache is None else self.disk_cache.to_dict(),
+			}
+
+
+def parse_job(payload: dict) -> tuple[Job, typing.Union[float, None]]:
+	# {"board": "<cells, one per line>" or "cells": [...], "size": null, "swap": 1, "engine": "trie", "top": null,
+	#  "limit": 100, "timeout": seconds}. Without a size the board is as large as the cells fill
+	if "cells" in payload:
+		cells = payload["cells"]
+	elif "board" in payload:
+		cells = [line.strip() for line in payload["board"].split("\n") if line.strip() != ""]
+	else:
+		raise Exception("payload needs \"board\" or \"cells\"")
+
+	engine = payload.get("engine", "trie")
+	if not engine in protocol.ENGINES:
+		raise Exception(f"unknown engine \"{engine}\"")
+
+	top = payload.get("top")
+	size = payload.get("size")
+	job = Job(batch.parse_board(cells, None if size is None else int(size)), engine, int(payload.get("swap", 1)), None if top is None else int(top),
+			  int(payload.get("limit", protocol.RESULT_LIMIT)))
+	timeout = payload.get("timeout")
+
+	return job, None if timeout is None else float(timeout)
+
+
+class DaemonHandler(http.server.BaseHTTPRequestHandler):
+	service: SolverService
+	timeout_limit: float
+
+	def reply(self, status: int, body: dict):
+		data = json.dumps(body).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def do_GET(self):
+		if self.path == protocol.STATS_PATH:
+			self.reply(protocol.OK, self.service.stats())
+		elif self.path == protocol.HEALTH_PATH:
+			self.reply(protocol.OK, {"status": "ok"})
+		else:
+			self.reply(protocol.NOT_FOUND, {"error": f"unknown path {self.path}"})
+
+	def do_POST(self):
+		if self.path != protocol.SOLVE_PATH:
+			self.reply(protocol.NOT_FOUND, {"error": f"unknown path {self.path}"})
+			return
+
+		try:
+			length = int(self.headers.get("Content-Length", 0))
+			job, timeout = parse_job(json.loads(self.rfile.read(length)))
+		except Exception as e:
+			self.reply(protocol.BAD_REQUEST, {"error": str(e)})
+			return
+
+		# a client can ask for a shorter timeout than the server's, never a longer one
+		timeout = self.timeout_limit if timeout is None else min(timeout, self.timeout_limit)
+		try:
+			self.reply(protocol.OK, self.service.submit(job, timeout))
+		except queue.Full:
+			self.reply(protocol.QUEUE_FULL, {"error": "request queue is full"})
+		except TimeoutError as e:
+			self.reply(protocol.TIMED_OUT, {"error": str(e)})
+		except Exception as e:
+			self.reply(protocol.SERVER_ERROR, {"error": str(e)})
+
+	def log_message(self, format, *args):
+		pass
+
+
+def serve(service: SolverService, host: str = protocol.DEFAULT_HOST, port: int = protocol.DEFAULT_PORT,
+		  timeout: float = protocol.REQUEST_TIMEOUT) -> http.server.ThreadingHTTPServer:
+	handler = type("BoundDaemonHandler", (DaemonHandler,), {"service": service, "timeout_limit": timeout})
+	server = http.server.ThreadingHTTPServer((host, port), handler)
+	server.daemon_threads = True
+	return server
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="SpellcastHelper solver daemon")
+	parser.add_argument("--host", default=protocol.DEFAULT_HOST)
+	parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT)
+	parser.add_argument("--queue", type=int, default=QUEUE_SIZE, help="boards waiting for a solver before 503")
+	parser.add_argument("--timeout", type=float, default=protocol.REQUEST_TIMEOUT, help="longest a request may wait in seconds")
+	parser.add_argument("--threads", type=int, default=1, help="solver threads")
+	parser.add_argument("--cache", type=int, default=CACHE_SIZE, help="board results kept for repeated boards")
+	parser.add_argument("--cache-file", default=None, metavar="FILE",
+						help="also keep results in a sqlite file shared with other processes")
+	parser.add_argument("--cache-file-size", type=int, default=board_cache.CAPACITY,
+						help="boards kept in the cache file")
+	args = parser.parse_args()
+
+	provider = word_provider.get_default_provider()
+	word_dictionary = word_provider.get_dictionary(provider)
+	LOGGER.info(f"Loaded {word_dictionary.word_count()} words from \"{provider}\"")
+
+	disk_cache = None if args.cache_file is None else board_cache.BoardCache(args.cache_file, args.cache_file_size)
+	server = serve(SolverService(word_dictionary, args.queue, args.threads, args.cache, disk_cache), args.host,
+				   args.port, args.timeout)
+	LOGGER.info(f"Listening on http://{args.host}:{server.server_address[1]}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		word_dictionary.close()
@@ -0,0 +1,264 @@
+import fnmatch
+import hashlib
+import json
+import mmap
+import os
+import struct
+import typing
+from array import array
+
+from trie import Trie, letter_code
+
+MAGIC = b"SCDX"
+VERSION = 4
+BYTE_ORDER_MARK = 0x01020304
+
+# magic, version, byte order mark, source size, source mtime (ns), node count, word count, words blob size,
+# shard names size
+HEADER = struct.Struct("=4sIIQQIIII")
+ALIGN = 8
+
+# a word list without a shards file is one shard
+DEFAULT_SHARD = "all"
+
+
+def padding(offset: int) -> int:
+	return (-offset) % ALIGN
+
+
+def source_stamp(source: str) -> tuple[int, int]:
+	stat = os.stat(source)
+	return stat.st_size, stat.st_mtime_ns
+
+
+def letter_mask(word: str) -> int:
+	mask = 0
+	for char in word:
+		mask |= 1 << letter_code(char)
+	return mask
+
+
+def shards_file(source: str) -> str:
+	# "<region>.<tier>" names and line counts of the consecutive runs of the word list, written along with it
+	return os.path.splitext(source)[0] + ".shards"
+
+
+def read_shards(source: str) -> tuple[list[str], list[int]]:
+	# shard names and the shard of every line of the word list, an empty list when it has no shards file
+	path = shards_file(source)
+	if not os.path.exists(path):
+		return [DEFAULT_SHARD], []
+
+	with open(path, "r", encoding="utf-8") as f:
+		runs = json.load(f)
+
+	names = []
+	lines = []
+	for name, count in runs:
+		if name not in names:
+			names.append(name)
+		lines.extend([names.index(name)] * count)
+
+	return names, lines
+
+
+def shard_tier(name: str) -> int:
+	# "english.35" -> 35, shards without a tier come first
+	tier = name.rsplit(".", 1)[-1]
+	return int(tier) if tier.isdigit() else 0
+
+
+def select_shards(names: list[str], patterns: typing.Union[list[str], None]) -> int:
+	# bitmask of the shards matching any of the patterns ("english.*", "*.10", "british.35"), all without patterns
+	if patterns is None:
+		return (1 << len(names)) - 1
+
+	mask = 0
+	for index, name in enumerate(names):
+		if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+			mask |= 1 << index
+
+	if mask == 0:
+		raise Exception(f"no shard matches {' '.join(patterns)}, the shards are {' '.join(names)}")
+
+	return mask
+
+
+def tier_masks(names: list[str], allowed: int) -> list[tuple[int, int]]:
+	# (tier, bitmask of its allowed shards), most common tier first
+	tiers = {}
+	for index, name in enumerate(names):
+		if (allowed >> index) & 1:
+			tiers[shard_tier(name)] = tiers.get(shard_tier(name), 0) | (1 << index)
+
+	return sorted(tiers.items())
+
+
+def read_header(path: str) -> typing.Union[tuple, None]:
+	try:
+		with open(path, "rb") as f:
+			data = f.read(HEADER.size)
+	except OSError:
+		return None
+
+	if len(data) != HEADER.size:
+		return None
+
+	return HEADER.unpack(data)
+
+
+def is_current(path: str, source: str) -> bool:
+	header = read_header(path)
+	if header is None:
+		return False
+
+	magic, version, byte_order, size, mtime, _, _, _, _ = header
+	if magic != MAGIC or version != VERSION or byte_order != BYTE_ORDER_MARK:
+		return False
+
+	if os.path.exists(shards_file(source)) and os.path.getmtime(shards_file(source)) > os.path.getmtime(path):
+		return False
+
+	return (size, mtime) == source_stamp(source)
+
+
+def build(source: str, path: str) -> None:
+	stamp = source_stamp(source)
+
+	names, line_shards = read_shards(source)
+	with open(source, "r", encoding="utf-8") as f:
+		text = f.read()
+	lines = text.split("\n") if text != "" else []
+
+	shards = None
+	if len(line_shards) > 0:
+		if len(line_shards) != len(lines):
+			raise Exception(f"{shards_file(source)} covers {len(line_shards)} lines, {source} has {len(lines)}")
+		shards = dict(zip(lines, line_shards))
+	trie = Trie.from_words(lines, shards)
+	names_blob = json.dumps(names).encode("utf-8")
+
+	offsets = array("I", [0])
+	lengths = array("B")
+	masks = array("I")
+	blob = bytearray()
+	for word in trie.words:
+		blob += word.encode("ascii")
+		offsets.append(len(blob))
+		lengths.append(min(len(word), 255))
+		masks.append(letter_mask(word))
+
+	sections = [
+		array("i", trie.terminal).tobytes(),
+		array("I", trie.child_mask).tobytes(),
+		array("i", trie.first_child).tobytes(),
+		array("B", trie.max_depth).tobytes(),
+		array("H", trie.max_value).tobytes(),
+		array("I", trie.suffix_mask).tobytes(),
+		array("Q", trie.shard_mask).tobytes(),
+		array("B", trie.letter).tobytes(),
+		offsets.tobytes(),
+		lengths.tobytes(),
+		masks.tobytes(),
+		array("B", trie.word_shards).tobytes(),
+		bytes(blob),
+		names_blob
+	]
+
+	temp = path + ".tmp"
+	with open(temp, "wb") as f:
+		f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, stamp[0], stamp[1], trie.node_count(),
+			trie.word_count(), len(blob), len(names_blob)))
+		f.write(b"\0" * padding(HEADER.size))
+		for section in sections:
+			f.write(section)
+			f.write(b"\0" * padding(len(section)))
+
+	# readers only ever see a complete artifact
+	os.replace(temp, path)
+
+
+class WordTable(typing.Sequence[str]):
+	offsets: memoryview
+	blob: memoryview
+
+	def __init__(self, offsets: memoryview, blob: memoryview):
+		self.offsets = offsets
+		self.blob = blob
+
+	def __len__(self):
+		return len(self.offsets) - 1
+
+	def __getitem__(self, word_id: int) -> str:
+		return str(self.blob[self.offsets[word_id]:self.offsets[word_id + 1]], "ascii")
+
+	def __iter__(self):
+		for word_id in range(len(self)):
+			yield self[word_id]
+
+
+class CompiledDictionary:
+	path: str
+	trie: Trie
+	words: WordTable
+	lengths: memoryview
+	masks: memoryview
+	word_shards: memoryview
+	shards: list[str]
+	fingerprint: str
+
+	def __init__(self, path: str):
+		self.path = path
+		self.file = open(path, "rb")
+		self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.buffer = memoryview(self.mm)
+		self.views = []
+
+		magic, version, byte_order, _, _, node_count, word_count, blob_size, names_size = \
+			HEADER.unpack_from(self.mm, 0)
+		if magic != MAGIC or version != VERSION or byte_order != BYTE_ORDER_MARK:
+			self.close()
+			raise Exception(f"incompatible dictionary artifact: \"{path}\"")
+
+		# the header holds the format version and the stamp of the word list the artifact was built from
+		self.fingerprint = hashlib.sha256(self.mm[:HEADER.size]).hexdigest()[:16]
+		self.offset = HEADER.size + padding(HEADER.size)
+
+		terminal = self.section("i", 4, node_count)
+		child_mask = self.section("I", 4, node_count)
+		first_child = self.section("i", 4, node_count)
+		max_depth = self.section("B", 1, node_count)
+		max_value = self.section("H", 2, node_count)
+		suffix_mask = self.section("I", 4, node_count)
+		shard_mask = self.section("Q", 8, node_count)
+		letter = self.section("B", 1, node_count)
+		offsets = self.section("I", 4, word_count + 1)
+		self.lengths = self.section("B", 1, word_count)
+		self.masks = self.section("I", 4, word_count)
+		self.word_shards = self.section("B", 1, word_count)
+		blob = self.section("B", 1, blob_size)
+		self.shards = json.loads(bytes(self.section("B", 1, names_size)).decode("utf-8"))
+
+		self.words = WordTable(offsets, blob)
+		self.trie = Trie(terminal, child_mask, first_child, max_depth, max_value, suffix_mask, self.words, shard_mask,
+						 self.word_shards, letter)
+
+	def section(self, format: str, item_size: int, count: int) -> memoryview:
+		size = item_size * count
+		raw = self.buffer[self.offset:self.offset + size]
+		view = raw.cast(format)
+		self.views.append(view)
+		self.views.append(raw)
+		self.offset += size + padding(size)
+		return view
+
+	def word_count(self) -> int:
+		return len(self.words)
+
+	def close(self):
+		for view in self.views:
+			view.release()
+		self.views = []
+		self.buffer.release()
+		self.mm.close()
+		self.file.close()
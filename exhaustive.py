@@ -0,0 +1,175 @@
+import typing
+
+from spellcast import *
+from solver import swap_char
+from trie import is_playable, letter_code
+
+UNREACHABLE = 1 << 30
+
+
+class ExhaustiveWordSearch:
+	word: str
+	spellcast: SpellCastMap
+	swap_available: int
+	board: Board
+	cells: list[int]
+	codes: list[int]
+	neighbours: list[list[int]]
+	remaining: list[list[int]]
+	paths: list[tuple[int, ...]]
+
+	def __init__(self, target_word: str, spellcast_m: SpellCastMap, swap_available: int):
+		self.word = target_word
+		self.spellcast = spellcast_m
+		self.swap_available = swap_available
+		self.board = spellcast_m.board
+		self.neighbours = self.board.neighbour_cells
+		self.cells = [cell for cell in range(len(self.board.cells)) if self.board.is_filled(cell)]
+		self.codes = [letter_code(char) for char in target_word]
+		self.remaining = []
+		self.paths = []
+
+	def cost(self, cell: int, offset: int) -> int:
+		return 0 if self.board.letters[cell] == self.codes[offset] else 1
+
+	def is_reachable(self) -> bool:
+		# forward pass: fewest swaps needed to spell word[:offset + 1] ending on each cell, revisits allowed
+		budget = self.swap_available
+		frontier = {}
+		for cell in self.cells:
+			cost = self.cost(cell, 0)
+			if cost <= budget:
+				frontier[cell] = cost
+
+		for offset in range(1, len(self.word)):
+			if len(frontier) == 0:
+				return False
+
+			next_frontier = {}
+			for cell, used in frontier.items():
+				for neighbour in self.neighbours[cell]:
+					if not self.board.is_filled(neighbour):
+						continue
+					cost = used + self.cost(neighbour, offset)
+					if cost <= budget and cost < next_frontier.get(neighbour, UNREACHABLE):
+						next_frontier[neighbour] = cost
+			frontier = next_frontier
+
+		return len(frontier) > 0
+
+	def build_remaining(self):
+		# backward pass: remaining[offset][cell] is a lower bound of the swaps needed to spell word[offset:]
+		# from cell. It ignores revisits, so it never prunes a valid path.
+		length = len(self.word)
+		self.remaining = [[UNREACHABLE] * len(self.board.cells) for _ in range(length)]
+
+		for cell in self.cells:
+			self.remaining[length - 1][cell] = self.cost(cell, length - 1)
+
+		for offset in range(length - 2, -1, -1):
+			after = self.remaining[offset + 1]
+			for cell in self.cells:
+				best = UNREACHABLE
+				for neighbour in self.neighbours[cell]:
+					if after[neighbour] < best:
+						best = after[neighbour]
+				self.remaining[offset][cell] = self.cost(cell, offset) + best
+
+	def run(self) -> list[Selection]:
+		return [self.to_selection(path) for path in self.find_paths()]
+
+	def find_paths(self) -> list[tuple[int, ...]]:
+		# cell indices of every path spelling the word
+		self.paths = []
+
+		if not is_playable(self.word) or not self.is_reachable():
+			return self.paths
+
+		self.build_remaining()
+
+		for cell in self.cells:
+			if self.remaining[0][cell] <= self.swap_available:
+				self.search(cell, 0, 0, 0, [])
+
+		return self.paths
+
+	def search(self, cell: int, offset: int, used: int, visited: int, path: list[int]):
+		used += self.cost(cell, offset)
+		visited |= 1 << cell
+		path.append(cell)
+
+		if offset + 1 == len(self.word):
+			self.paths.append(tuple(path))
+		else:
+			remaining = self.remaining[offset + 1]
+			for neighbour in self.neighbours[cell]:
+				if (visited >> neighbour) & 1:
+					continue
+				if used + remaining[neighbour] > self.swap_available:
+					continue
+				self.search(neighbour, offset + 1, used, visited, path)
+
+		path.pop()
+
+	def to_selection(self, path: typing.Sequence[int]) -> Selection:
+		selection = Selection()
+		for offset, cell in enumerate(path):
+			char = self.board.cells[cell]
+			if char.c.char != self.word[offset]:
+				char = swap_char(char, LETTERS.index(self.word[offset]))
+			selection.next(char)
+
+		return selection
+
+	def best(self) -> typing.Union[Selection, None]:
+		best = None
+		best_value = None
+		for selection in self.run():
+			value = selection.get_total_value()
+			if best is None or value > best_value:
+				best = selection
+				best_value = value
+
+		return best
+
+
+def find_selection_exhaustive(spellcast_m: SpellCastMap, word_map: list, swap_available_m: int,
+							  best_only: bool = True) -> list[Selection]:
+	if not best_only:
+		results = []
+		for word_m in word_map:
+			results.extend(ExhaustiveWordSearch(word_m, spellcast_m, swap_available_m).run())
+
+		return results
+
+	# the paths of all words are scored at once, only the best path of each word becomes a Selection
+	searches = []
+	paths = []
+	words = []
+	for word_m in word_map:
+		search = ExhaustiveWordSearch(word_m, spellcast_m, swap_available_m)
+		found = search.find_paths()
+		if len(found) == 0:
+			continue
+
+		searches.append((search, len(found)))
+		paths.extend(found)
+		words.extend([word_m] * len(found))
+
+	if len(paths) == 0:
+		return []
+
+	import scoring
+	scorer = scoring.BoardScorer(spellcast_m)
+	batch = scoring.PathBatch.from_paths(paths)
+	batch.swapped = scorer.swapped(batch, words)
+	scores = scorer.score(batch)
+
+	results = []
+	start = 0
+	for search, count in searches:
+		# argmax keeps the first of equal paths, like best()
+		results.append(search.to_selection(paths[start + int(scores[start:start + count].argmax())]))
+		start += count
+
+	return results
@@ -1,5 +1,6 @@
 import crayons
 import datetime
+import typing
 
 def datetime_format(format: str):
 	now = datetime.datetime.now()
@@ -8,9 +9,11 @@ def datetime_format(format: str):
 class Logger:
 
 	name: str
+	stream: typing.Union[typing.TextIO, None]
 
-	def __init__(self, name: str):
+	def __init__(self, name: str, stream: typing.Union[typing.TextIO, None] = None):
 		self.name = name
+		self.stream = stream  # None: stdout
 
 	def info(self, message: str):
 		self.log(f"/ {self.name}: INFO >> " + crayons.black(message, bold=True))
@@ -19,4 +22,4 @@ class Logger:
 		self.log(crayons.yellow(f"/ {self.name}: WARNING >> ") + crayons.black(message, bold=True))
 
 	def log(self, message: str):
-		print(crayons.cyan(datetime_format('[%Y/%m/%d %H:%M:%S]'), bold=True) + " " + message, flush=True)
\ No newline at end of file
+		print(crayons.cyan(datetime_format('[%Y/%m/%d %H:%M:%S]'), bold=True) + " " + message, file=self.stream, flush=True)
\ No newline at end of file
@@ -1,241 +1,19 @@
+import argparse
+import contextlib
 import os.path
-import typing
 
-import pymorton
-import tqdm
-from typing import Union, Dict, Any
-import navigator
-import window
 import time
-from PIL import Image
 import logger
 import sys
 import crayons
 import word_provider
-from concurrent import futures
+import dictionary
+import solver
+import exhaustive
+import protocol
+from profiler import PROFILER
 from spellcast import *
-
-
-class CharStream:
-	text: str
-
-	def __init__(self, text: str):
-		self.text = text
-		self.offset = 0
-
-	def is_eof(self):
-		return (self.offset + 1) == len(self.text)
-
-	def is_reached_eof(self):
-		return self.offset >= len(self.text)
-
-	def is_start(self):
-		return self.offset == 0
-
-	def next(self) -> str:
-		text = self.text[self.offset]
-		self.offset += 1
-
-		if len(self.text) <= self.offset:
-			raise Exception("no char in buffer")
-
-		return text
-
-	def previous(self):
-		self.offset -= 1
-
-		if self.offset < 0:
-			raise Exception("offset < 0")
-
-	def current(self) -> SingleChar:
-		return SingleChar(self.text[self.offset])
-
-	def __str__(self):
-		return self.current()
-
-
-class SpellCastCharFactory:
-	values: dict[str, int]
-
-	def __init__(self):
-		self.values = {
-			"a": 1,
-			"b": 4,
-			"c": 5,
-			"d": 3,
-			"e": 1,
-			"f": 5,
-			"g": 3,
-			"h": 4,
-			"i": 1,
-			"j": 7,
-			"k": 6,
-			"l": 3,
-			"m": 4,
-			"n": 2,
-			"o": 1,
-			"p": 4,
-			"q": 8,
-			"r": 2,
-			"s": 2,
-			"t": 2,
-			"u": 4,
-			"v": 5,
-			"w": 5,
-			"x": 7,
-			"y": 4,
-			"z": 8
-		}
-
-	def get(self, v: Vector, c: SingleChar, multiplier: float = 1.0, mark_double: bool = False):
-		if not c.char in LETTERS:
-			raise Exception(f"char \"{c.char}\" not used in spellcast")
-
-		return SpellCastChar(v, c, self.values[c.char], multiplier, mark_double)
-
-
-class FindWordWizard:
-	selection: Selection
-	eliminated: list
-	start: SpellCastChar
-	word: CharStream
-	spellcast: SpellCastMap
-	success: bool
-
-	def __init__(self, start: SpellCastChar, target_word: str, spellcast_m: SpellCastMap, swap_available: int):
-		self.selection = Selection()
-		self.selection.next(start)
-		self.start = start
-		self.eliminated = []
-		self.word = CharStream(target_word)
-		self.word.next()
-		self.spellcast = spellcast_m
-		self.success = False
-		self.swap_available = swap_available
-		self.last_tried_swap = False
-
-	def __old_is_eliminated(self, v: Vector):
-		return pymorton.interleave2(v.x, v.y) in self.eliminated
-
-	def __old_eliminate(self, v: Vector):
-		self.eliminated.append(pymorton.interleave2(v.x, v.y))
-
-	def is_eliminated(self, v: Vector):
-		return self.selection.is_eliminated(v)
-
-	def eliminate(self, v: Vector):
-		self.selection.eliminate(self.selection.length, v)
-
-	def find_neighbours(self, v: Vector, target_char: SingleChar) -> Union[SpellCastChar, None]:
-		neighbours = self.spellcast.get_neighbours(v)
-
-		found = False
-		for v, c in neighbours.items():
-			if target_char.char == c.c.char and (not self.is_eliminated(v)) and (
-					not self.selection.has_exact(c)):  # c.c.char www
-				found = True
-
-				break
-		if found:
-			return c
-		else:
-			return None
-
-	def check_selection(self):
-		if self.selection.get_raw_text() == self.word.text:
-			self.success = True
-		return self.success
-
-	def run(self):
-		while True:
-			current_char = self.word.current()
-
-			# print(self.selection.get_text() + f", {current_char}" + " / " + self.word.text)
-
-			result = self.find_neighbours(self.selection.get_current().v, current_char)
-
-			found = result is not None
-
-			# 次のchar があったなら
-			if found:
-				self.selection.next(result)
-
-				# print("Attempting: " + self.selection.get_text() + " / " + self.word.text + f" (current: {
-				# current_char}, word_offset: {self.word.offset})")
-				if self.check_selection():
-					break
-
-				self.word.next()
-			if not found:
-				# print("not found")
-				if self.check_selection():
-					break
-
-				if self.word.offset <= 1:
-					break
-
-				if len(self.selection.get_swapped()) < self.swap_available and not self.last_tried_swap:
-					# まだスワップできて前回スワップ失敗していないなら
-
-					swap_result = Union[SpellCastChar, None]
-					scaffold = None
-					# print("try swap")
-
-					for target_v, c in self.spellcast.get_neighbours(self.selection.get_current().v).items():
-						if (not self.is_eliminated(target_v)) and (not self.selection.has_exact(c)):
-							swap_result = c
-							scaffold = target_v
-							break
-					swap_found = swap_result is not None
-
-					if swap_found and scaffold is not None:
-
-						char_swap_from = self.spellcast.get(scaffold)
-
-						char = SpellCastChar(scaffold, current_char, 0, char_swap_from.multiplier,
-							char_swap_from.mark_double)
-						char.swapped = True
-						char.swapped_from = char_swap_from
-
-						# self.spellcast.set(char)
-
-						self.selection.next(char)
-						if not self.word.is_eof():
-							self.word.next()
-
-						if self.check_selection():
-							break
-					else:
-						self.last_tried_swap = True
-					continue
-
-				# これ以上見つからなかったら現在のマスを排除されたとしてマークして、前のマスに戻る
-
-				before = self.selection.get_current()
-				self.word.previous()
-				if self.selection.length > 1:
-					self.selection.previous()
-
-				self.eliminate(before.v)
-
-			self.last_tried_swap = False
-
-
-# print("break")
-
-
-def find_selection(spellcast_m: SpellCastMap, word_map: list, swap_available_m: int) -> list[FindWordWizard]:
-	results = []
-	for word_m in word_map:
-		starts = spellcast_m.find(word_m[0])
-		if starts is None:
-			continue
-		for c in starts:
-			wizard = FindWordWizard(c, word_m, spellcast_m, swap_available_m)
-			wizard.run()
-			results.append(wizard)
-
-	return results
+from wizard import *
 
 
 if __name__ == '__main__':
@@ -248,21 +26,104 @@ if __name__ == '__main__':
 		time.sleep(3)
 		word_provider.download_all()
 
-	threaded = False
-	future_executor = futures.ProcessPoolExecutor()
-
-	auto_navigate = False
-
-	swap_available = 1
-
-	if len(sys.argv) > 1:
-		auto_navigate = sys.argv[1] == "true"
-
-	if len(sys.argv) > 2:
-		swap_available = int(sys.argv[2])
+	parser = argparse.ArgumentParser(description="SpellcastHelper")
+	parser.add_argument("auto_navigate", nargs="?", default="false")
+	parser.add_argument("swap_available", nargs="?", type=int, default=1)
+	parser.add_argument("--engine", choices=["trie", "wizard", "exhaustive"], default="trie",
+		help="trie: single board walk guided by a prefix trie, wizard: FindWordWizard per word, "
+			 "exhaustive: every path and swap placement per word")
+	parser.add_argument("--all-paths", action="store_true",
+		help="exhaustive engine: list every distinct path instead of the best one per word")
+	parser.add_argument("--workers", type=int, default=None, metavar="N",
+		help="solve on N worker processes (0: one per core)")
+	parser.add_argument("--top", type=int, default=None, metavar="K",
+		help="only keep the K best scoring words, the trie engine also cuts branches that cannot beat them")
+	parser.add_argument("--turns", action="store_true",
+		help="trie engine: after the results, enter only the cells that changed and solve the next turn")
+	parser.add_argument("--deadline-ms", type=float, default=None, metavar="MS",
+		help="stop searching after MS milliseconds and show the best words found until then, valuable words are tried first")
+	parser.add_argument("--capture", nargs="?", const="./glyphs.npz", default=None, metavar="TEMPLATES",
+		help="read the board from the screen with the glyph templates (./glyphs.npz) instead of asking for every cell, "
+			 "only uncertain cells are asked for")
+	parser.add_argument("--shards", nargs="+", default=None, metavar="PATTERN",
+		help="only use the dictionary shards matching a pattern, shards are named <region>.<tier> (english.*, *.10, british.35)")
+	parser.add_argument("--tiers", action="store_true",
+		help="trie engine: search the dictionary tier by tier, most common first, and show each tier as it is done. "
+			 "--deadline-ms cuts off the remaining tiers")
+	parser.add_argument("--play-at", type=float, default=None, metavar="SCORE",
+		help="auto_navigate with the trie engine: drag the first word scoring SCORE or more while the search goes on, "
+			 "or the best word so far at --deadline-ms")
+	parser.add_argument("--profile", nargs="?", const="profile.json", default=None, metavar="FILE",
+		help="count hot path calls and time each phase, print a summary and write it as json to FILE (profile.json)")
+	parser.add_argument("--size", type=int, default=None, metavar="N",
+		help="board side length, 5 by default. Batch mode infers it from each board when not given")
+	parser.add_argument("--cache", nargs="?", const="", default=None, metavar="FILE",
+		help="keep solved boards in a sqlite file (./results.db) and answer repeated boards from it")
+	parser.add_argument("--cache-size", type=int, default=None, metavar="N",
+		help="boards kept in the cache before the least recently used ones are evicted (10000)")
+	parser.add_argument("--batch", default=None, metavar="FILE",
+		help="solve every board of FILE (- for stdin) and write one json line per board, boards are separated by a blank line")
+	parser.add_argument("--output", default=None, metavar="FILE", help="batch: write the json lines to FILE instead of stdout")
+	parser.add_argument("--limit", type=int, default=protocol.RESULT_LIMIT, help="results per board in batch mode, words kept by the wizard and exhaustive engines")
+	args = parser.parse_args()
+
+	if args.deadline_ms is not None and args.workers is not None:
+		parser.error("--deadline-ms can not be used with --workers")
+	if args.size is not None and args.size < 2:
+		parser.error("--size must be at least 2")
+	if args.turns and (args.top is not None or args.deadline_ms is not None):
+		parser.error("--turns can not be used with --top and --deadline-ms")
+	if args.turns and (args.engine != "trie" or args.workers is not None):
+		parser.error("--turns needs the trie engine without --workers")
+	if args.play_at is not None and args.auto_navigate != "true":
+		parser.error("--play-at needs auto_navigate")
+	if args.play_at is not None and (args.engine != "trie" or args.workers is not None or args.turns):
+		parser.error("--play-at needs the trie engine without --workers and --turns")
+	if args.engine == "trie" and (args.shards is not None or args.tiers) and \
+			(args.workers is not None or args.turns or args.top is not None or args.play_at is not None):
+		parser.error("--shards and --tiers with the trie engine can not be used with --workers, --turns, --top and --play-at")
+	if args.tiers and args.engine != "trie":
+		parser.error("--tiers needs the trie engine")
+	if args.cache is not None and (args.turns or args.tiers or args.play_at is not None):
+		parser.error("--cache can not be used with --turns, --tiers and --play-at")
+
+	# sqlite and the json records only load for the cache, batch mode and the cells typed as text
+	cache = None
+	if args.cache is not None:
+		import batch
+		import board_cache
+		cache = board_cache.BoardCache(args.cache or board_cache.DEFAULT_PATH,
+									   board_cache.CAPACITY if args.cache_size is None else args.cache_size)
+
+	if args.batch is not None:
+		import batch
+		# stdout only carries json lines, anything logged while loading goes to stderr
+		with contextlib.redirect_stdout(sys.stderr):
+			batch_dictionary = word_provider.get_dictionary(word_provider.get_default_provider())
+
+		source = sys.stdin if args.batch == "-" else open(args.batch, "r", encoding="utf-8")
+		output = sys.stdout if args.output is None else open(args.output, "w", encoding="utf-8")
+		try:
+			batch.run(source, output, batch_dictionary, args.engine, args.swap_available, args.top, args.limit, args.size,
+					  cache)
+		finally:
+			if source is not sys.stdin:
+				source.close()
+			if output is not sys.stdout:
+				output.close()
+
+		sys.exit(0)
+
+	if args.profile is not None:
+		PROFILER.enable()
+
+	auto_navigate = args.auto_navigate == "true"
+	swap_available = args.swap_available
+	engine = args.engine
 
 	words = []
-	spellcast = SpellCastMap(5)
+	board_size = args.size or 5
+	spellcast = SpellCastMap(board_size)
 
 	default_provider = word_provider.get_default_provider()
 
@@ -271,40 +132,59 @@ if __name__ == '__main__':
 		word_provider.download(default_provider)
 
 	main_logger.info(f"Getting word list. provider: \"{default_provider}\"")
-	words_raw = word_provider.get_providing(default_provider, False)
-
-	size_wizard = window.WindowSizeWizard()
-
-	if auto_navigate:
-		with open("./default_spellcast_window.txt", "r", encoding="utf-8") as f:
-			positions = f.read().split("\n")
-			if len(positions) == 6:
-				size_wizard.positions = {
-					0: window.AbsolutePosition(float(positions[0]), float(positions[1])),
-					1: window.AbsolutePosition(float(positions[2]), float(positions[3])),
-					2: window.AbsolutePosition(float(positions[4]), float(positions[5]))
-				}
-				size_wizard.finalize()
-
-				main_logger.info("Loaded window size from default.")
-
-		if len(size_wizard.positions) != 3:
-			main_logger.info("Run window size wizard for navigating.")
-			size_wizard.run()
-
-		nav = navigator.Navigator(size_wizard)
-
-	main_logger.info("Please input spellcast map")
-	main_logger.info("Format: ")
-	print(
-		"""----->
------>
------>
------>
------>""")
-
-	for y in range(5):
-		for x in range(5):
+	with PROFILER.phase("load dictionary"):
+		word_dictionary = word_provider.get_dictionary(default_provider, False)
+	trie = word_dictionary.trie
+	main_logger.info(f"Loaded {trie.word_count()} words ({trie.node_count()} nodes)")
+	try:
+		allowed_shards = dictionary.select_shards(word_dictionary.shards, args.shards)
+	except Exception as e:
+		parser.error(str(e))
+	if args.shards is not None:
+		selected = [name for index, name in enumerate(word_dictionary.shards) if (allowed_shards >> index) & 1]
+		main_logger.info(f"Shards: {' '.join(selected)}")
+
+	if engine != "trie":
+		import prefilter
+		with PROFILER.phase("index"):
+			word_filter = prefilter.Prefilter.from_dictionary(word_dictionary)
+
+	if args.workers is not None:
+		import parallel
+		parallel_solver = parallel.ParallelSolver(word_dictionary, args.workers)
+		main_logger.info(f"Solving on {parallel_solver.workers} workers")
+
+	if auto_navigate or args.capture is not None:
+		# the gui stack only loads when navigating, solving works headless
+		import navigator
+		import window
+		size_wizard = window.load_default()
+		nav = navigator.Navigator(size_wizard, board_size)
+
+	captured = {}
+	if args.capture is not None:
+		import batch
+		import recognize
+		with PROFILER.phase("capture"):
+			cells, confidence = recognize.read_screen(nav, args.capture)
+		for index, text in enumerate(cells):
+			if confidence[index] >= recognize.MIN_SCORE:
+				captured[(index % board_size, index // board_size)] = text
+		main_logger.info(f"Read {len(captured)} of {len(cells)} cells from the screen")
+		print("\n".join(" | ".join(cells[y * board_size:(y + 1) * board_size]) for y in range(board_size)))
+
+	if len(captured) < board_size * board_size:
+		main_logger.info("Please input spellcast map" if len(captured) == 0 else "Please input the uncertain cells")
+		main_logger.info("Format: ")
+		print("\n".join(["-" * board_size + ">"] * board_size))
+
+	for y in range(board_size):
+		for x in range(board_size):
+			if (x, y) in captured:
+				main_char, multiplier, mark_double = batch.parse_cell(captured[(x, y)])
+				spellcast.set(char_factory.get(Vector(x, y), SingleChar(main_char), multiplier, mark_double))
+				continue
+
 			while True:
 				data = input(f"({x}, {y}): ")
 				sp_data = data.split()
@@ -332,73 +212,194 @@ if __name__ == '__main__':
 			spellcast.set(char_factory.get(Vector(x, y), SingleChar(main_char), multiplier, mark_double))
 
 	spellcast.generate_map_by_char()
-	words = list(set(words_raw.split("\n")))
+	if engine != "trie":
+		with PROFILER.phase("prefilter"):
+			survivors = word_filter.survivors(spellcast, swap_available)
+			if args.shards is not None:
+				survivors = [word_id for word_id in survivors if (allowed_shards >> word_dictionary.word_shards[word_id]) & 1]
+			if args.deadline_ms is not None:
+				# the words most likely on the board first, so the first milliseconds already find some
+				survivors = word_filter.likely_first(spellcast, survivors)
+			if args.workers is None:
+				words = [word_dictionary.words[int(word_id)] for word_id in survivors]
+
+	cache_key = None
+	cached_record = None
+	if cache is not None:
+		cache_key = batch.cache_key(spellcast, word_dictionary, engine, swap_available, args.top, args.limit, args.shards,
+									args.all_paths, args.deadline_ms)
+		cached_record = cache.get(cache_key)
 
 	print()  # for fix tqdm bug
 
 	main_logger.info("Searching start in 1 seconds...")
 	time.sleep(1)
 
-	futures = []
 	result = []
 	start = time.time()
-	cur = 0
-	cur_words = []
 
-	if threaded:
-		for word in tqdm.tqdm(words, position=0, ncols=70, mininterval=0.03):
-			cur += 1
-			cur_words.append(word)
-			if cur > 13000:
-				future = future_executor.submit(find_selection, spellcast, cur_words, swap_available)
-				futures.append(
-					future
-				)
-				cur = 0
-				cur_words = []
+	turn_solver = None
+	collector = None
+	deadline = None
+	expired = False
+	if args.deadline_ms is not None:
+		deadline = start + args.deadline_ms / 1000
+
+	if cached_record is not None:
+		result = [batch.record_selection(spellcast, found) for found in cached_record["results"]]
+	elif auto_navigate and args.play_at is not None:
+		# solving and dragging overlap, the played word is not dragged again below
+		import pipeline
+		played = pipeline.run(trie, spellcast, nav, swap_available, args.play_at, args.deadline_ms, args.top or 100)
+		result = played.results
+		expired = played.expired
+		auto_navigate = False
+		if played.chosen is None:
+			main_logger.warning("No word found to play")
+		else:
+			main_logger.info(f"Played {played.chosen.word} ({played.chosen.value}, {played.reason}) "
+							 f"{round((played.drag_started - played.started) * 1000, 1)}ms after the search started")
+	elif engine == "trie" and args.tiers:
+		tiered_solver = solver.TieredSolver(trie, allowed_shards, args.deadline_ms)
+		for tier, tier_result in tiered_solver.solve_tiers(spellcast, dictionary.tier_masks(word_dictionary.shards,
+				allowed_shards), swap_available):
+			best = max(tier_result, key=lambda selection: selection.get_total_value(), default=None)
+			main_logger.info(f"Tier {tier}: {len(tier_result)} words after {round(time.time() - start, 3)}s" +
+							 ("" if best is None else f", best {best.get_raw_text()} ({best.get_total_value()})"))
+			result.extend(tier_result)
+		expired = tiered_solver.expired
+	elif engine == "trie" and args.shards is not None:
+		tiered_solver = solver.TieredSolver(trie, allowed_shards, args.deadline_ms)
+		result = tiered_solver.solve(spellcast, swap_available)
+		expired = tiered_solver.expired
+	elif args.workers is not None:
+		result = parallel_solver.solve(spellcast, engine, swap_available, None if engine == "trie" else survivors,
+			not args.all_paths)
+		parallel_solver.shutdown()
+	elif engine == "trie" and (args.top is not None or deadline is not None):
+		top_solver = solver.TopKSolver(trie, args.top or 100, args.deadline_ms)
+		result = top_solver.solve(spellcast, swap_available)
+		expired = top_solver.expired
+	elif engine == "trie" and args.turns:
+		# the changed cells are typed as text
+		import batch
+		turn_solver = solver.TrieSolver(trie)
+		result = turn_solver.solve(spellcast, swap_available)
+	elif engine == "trie":
+		result = solver.TrieSolver(trie).solve(spellcast, swap_available)
+	elif engine == "exhaustive":
+		# best path of each word goes straight to the collector, --all-paths keeps them all
+		if not args.all_paths:
+			collector = solver.TopResults(args.top or args.limit)
+		for offset in range(0, len(words), 64):
+			if deadline is not None and time.time() >= deadline:
+				expired = True
+				break
+			selections = exhaustive.find_selection_exhaustive(spellcast, words[offset:offset + 64], swap_available,
+				not args.all_paths)
+			if collector is None:
+				result.extend(selections)
+				continue
+			for selection in selections:
+				collector.offer(selection.get_raw_text(), selection.get_total_value(), lambda: selection)
 	else:
+		import tqdm
+		collector = solver.TopResults(args.top or args.limit)
 		for word in tqdm.tqdm(words, position=0, ncols=70, mininterval=0.03):
-			wizards = find_selection(spellcast, [word], swap_available)
-			for wizard in wizards:
-				if wizard.success:
-					selection = wizard.selection
-					result.append(selection)
+			if deadline is not None and time.time() >= deadline:
+				expired = True
+				break
+			for found_word, selection in iter_selections(spellcast, [word], swap_available):
+				collector.offer(found_word, selection.get_total_value(), lambda: selection)
 		# sys.stdout.write("\r")
 		# text = selection.get_text()
 		# main_logger.info(crayons.green(f"Word found! {text}                         "))
 
-	if threaded:
-		for future in tqdm.tqdm(futures, position=0, ncols=70, mininterval=0.03):
-			wizards = future.result()
-			for wizard in wizards:
-				if wizard.success:
-					selection = wizard.selection
-					result.append(selection)
-		# sys.stdout.write("\r")
-		# text = selection.get_text()
-		# main_logger.info(crayons.green(f"Word found! {text}                         "))
+	if collector is not None:
+		result = collector.results()
+
+	if cache is not None and cached_record is None and not expired:
+		# the same record --batch keeps, so both answer from each other's entries
+		cache.put(cache_key, batch.board_record(0, result, time.time() - start, args.limit))
 
 	end = time.time()
 	elapsed = end - start
+	PROFILER.add_phase("search", elapsed)
 	main_logger.info(f"Takes {round(elapsed, 3)}s")
+	if expired:
+		main_logger.warning(f"Deadline of {args.deadline_ms}ms reached, showing the best words found so far")
 	print("\n")
 
-	main_logger.info(f"Found {len(result)} words.")
+	if cached_record is not None:
+		main_logger.info(f"Found {cached_record['found']} words in the cache, solved in {cached_record['elapsed']}s before.")
+	elif collector is not None:
+		main_logger.info(f"Found {collector.offered} paths, kept the best {len(result)} words.")
+	else:
+		main_logger.info(f"Found {len(result)} words.")
+	if engine != "trie":
+		main_logger.info(f"Prefilter: {word_filter.get_stats()}")
+
+	def show(result: list[Selection]):
+		count = 0
 
-	count = 0
+		for result_word in sorted(result, key=lambda x: x.get_total_value(), reverse=True):
+			count += 1
+			print(
+				result_word.get_text() + f": {crayons.magenta(result_word.get_total_value(), bold=True)} " + result_word.get_text_vectors())
 
-	for result_word in sorted(result, key=lambda x: x.get_total_value(), reverse=True):
-		count += 1
-		print(
-			result_word.get_text() + f": {crayons.magenta(result_word.get_total_value(), bold=True)} " + result_word.get_text_vectors())
+			swapped = result_word.get_swapped()
 
-		swapped = result_word.get_swapped()
+			# print("Swapped Chars: " + ", ".join(map(lambda c: f"{c.swapped_from.c.char} -> {c.c.char}", swapped)))
 
-		# print("Swapped Chars: " + ", ".join(map(lambda c: f"{c.swapped_from.c.char} -> {c.c.char}", swapped)))
+			if auto_navigate:
+				nav.navigate(result_word)
+				time.sleep(3)
 
-		if auto_navigate:
-			nav.navigate(result_word)
-			time.sleep(3)
+			if count > 100:
+				break
+
+	with PROFILER.phase("sort and render"):
+		show(result)
+
+	if args.profile is not None:
+		PROFILER.count("results", len(result))
+		print()
+		print(PROFILER.table())
+		PROFILER.write(args.profile)
+		main_logger.info(f"Profile written to {args.profile}")
+
+	if cache is not None:
+		stats = cache.to_dict()
+		main_logger.info(f"Cache: {stats['size']}/{stats['capacity']} boards, {stats['total_hits']} hits and "
+						 f"{stats['total_misses']} misses in {cache.path}")
+
+	# next turns: only the cells the played word used are entered again, the board is solved again. Most paths of a
+	# turn cross the 4-6 changed cells, re-searching only those is no faster than a full solve
+	while turn_solver is not None:
+		main_logger.info("Input the changed cells as \"x y <char> [multiplier] [true]\", an empty line to solve again. "
+						 "Nothing to quit")
+		changed = []
+		while True:
+			sp_data = input("> ").split(maxsplit=2)
+			if len(sp_data) == 0:
+				break
 
-		if count > 100:
+			try:
+				x, y = int(sp_data[0]), int(sp_data[1])
+				main_char, multiplier, mark_double = batch.parse_cell(sp_data[2])
+				spellcast.set(char_factory.get(Vector(x, y), SingleChar(main_char), multiplier, mark_double))
+			except Exception as e:
+				sys.stdout.write(f"\rInvalid cell ({e}). ")
+				continue
+
+			changed.append(Vector(x, y))
+
+		if len(changed) == 0:
 			break
+
+		spellcast.generate_map_by_char()
+		start = time.time()
+		result = turn_solver.solve(spellcast, swap_available)
+		main_logger.info(f"Takes {round(time.time() - start, 3)}s")
+		main_logger.info(f"Found {len(result)} words.")
+		show(result)
@@ -1,23 +1,94 @@
-import pyautogui
-import window
-import main
+from spellcast import Vector, Selection
 import time
+import types
+import typing
+
+
+class InputDevice:
+	# what the navigator drags with, the screen coordinates are absolute
+	def move(self, x: float, y: float):
+		raise NotImplementedError()
+
+	def down(self):
+		raise NotImplementedError()
+
+	def up(self):
+		raise NotImplementedError()
+
+
+class PyAutoGuiDevice(InputDevice):
+	# the real mouse, pyautogui only loads when it is used
+
+	def __init__(self):
+		import pyautogui
+		self.pyautogui = pyautogui
+
+	def move(self, x: float, y: float):
+		self.pyautogui.moveTo(x, y)
+
+	def down(self):
+		self.pyautogui.mouseDown()
+
+	def up(self):
+		self.pyautogui.mouseUp()
+
+
+class MockDevice(InputDevice):
+	# records (event, x, y, perf_counter) instead of moving anything, delay simulates a slow device
+	events: list[tuple[str, float, float, float]]
+	delay: float
+	x: float
+	y: float
+
+	def __init__(self, delay: float = 0.0):
+		self.events = []
+		self.delay = delay
+		self.x = 0.0
+		self.y = 0.0
+
+	def record(self, event: str):
+		if self.delay > 0:
+			time.sleep(self.delay)
+		self.events.append((event, self.x, self.y, time.perf_counter()))
+
+	def move(self, x: float, y: float):
+		self.x, self.y = x, y
+		self.record("move")
+
+	def down(self):
+		self.record("down")
+
+	def up(self):
+		self.record("up")
+
 
 class Navigator:
 
-	size: window.WindowSizeWizard
+	size: "window.WindowSizeWizard"
+	board_size: int
+	device: InputDevice
 
-	def __init__(self, size: window.WindowSizeWizard):
+	def __init__(self, size: "window.WindowSizeWizard", board_size: int = 5, gap: typing.Union[float, None] = None,
+				 button_size: typing.Union[float, None] = None, device: typing.Union[InputDevice, None] = None):
 		self.left_top = size.positions[0]
 		self.size = size
-		self.gap = 12 # hard coded
+		self.board_size = board_size
+		self.device = device if device is not None else PyAutoGuiDevice()
+
+		# measured on the 5x5 board, a bigger grid fits the same area with smaller cells
+		self.gap = gap if gap is not None else 12 * 5 / board_size
+		self.button_size = button_size if button_size is not None else 48 * 5 / board_size
 
-		self.button_size = 48 # hard coded
+	@staticmethod
+	def at(left_top: Vector, board_size: int = 5, gap: typing.Union[float, None] = None,
+		   button_size: typing.Union[float, None] = None, device: typing.Union[InputDevice, None] = None):
+		# a board whose top left corner is known, without the window size wizard
+		return Navigator(types.SimpleNamespace(positions=[left_top]), board_size, gap, button_size, device)
 
 	def get_pos(self, x_num: int, y_num: int):
 		x_diff = x_num * (self.button_size + self.gap) + (self.button_size / 2)
 		y_diff = y_num * (self.button_size + self.gap) + (self.button_size / 2)
-		return main.Vector(self.left_top.x + x_diff, self.left_top.y + y_diff)
+		return Vector(self.left_top.x + x_diff, self.left_top.y + y_diff)
 
 	def get_region(self, x_num: int, y_num: int):
 		x_diff = x_num * (self.button_size + self.gap)
@@ -29,15 +100,16 @@ class Navigator:
 			self.button_size
 		]
 
-	def navigate(self, selection: main.Selection, nv_sleep: float = 0.0):
+	def navigate(self, selection: Selection, nv_sleep: float = 0.0):
 		down = False
 		for length, c in selection.get_dirty().items():
 			window_v = self.get_pos(c.v.x, c.v.y)
 
-			pyautogui.moveTo(window_v.x, window_v.y)
+			self.device.move(window_v.x, window_v.y)
 			if not down:
-				pyautogui.mouseDown()
+				self.device.down()
+				down = True
 
 			time.sleep(nv_sleep)
 
-		pyautogui.mouseUp()
+		self.device.up()
@@ -0,0 +1,152 @@
+import os
+import time
+import typing
+from concurrent import futures
+
+import exhaustive
+import solver
+from dictionary import CompiledDictionary
+from spellcast import *
+from wizard import iter_selections
+
+# compact board: (size, ((x, y, char, value, multiplier, mark_double), ...))
+BoardKey = tuple
+# compact result: ((x, y, swapped letter or ""), ...) of a successful path
+PathKey = tuple
+
+CHUNK_SECONDS = 0.05
+FIRST_CHUNK = 64
+MAX_CHUNK = 8192
+
+WORKER_DICTIONARY: typing.Union[CompiledDictionary, None] = None
+WORKER_BOARD: typing.Union[tuple[BoardKey, SpellCastMap], None] = None
+
+
+def encode_board(spellcast_m: SpellCastMap) -> BoardKey:
+	cells = []
+	for v, c in sorted(spellcast_m.vector_map().items(), key=lambda item: (item[0].x, item[0].y)):
+		cells.append((v.x, v.y, c.c.char, c.value, c.multiplier, c.mark_double))
+
+	return spellcast_m.size, tuple(cells)
+
+
+def decode_board(key: BoardKey) -> SpellCastMap:
+	size, cells = key
+	spellcast_m = SpellCastMap(size)
+	for x, y, char, value, multiplier, mark_double in cells:
+		spellcast_m.set(SpellCastChar(Vector(x, y), SingleChar(char), value, multiplier, mark_double))
+	spellcast_m.generate_map_by_char()
+
+	return spellcast_m
+
+
+def encode_path(selection: Selection) -> PathKey:
+	return tuple((c.v.x, c.v.y, c.c.char if c.swapped else "") for c in selection.get().values())
+
+
+def decode_path(spellcast_m: SpellCastMap, path: PathKey) -> Selection:
+	selection = Selection()
+	for x, y, swapped in path:
+		char = spellcast_m.get_at(x, y)
+		if swapped != "":
+			char = solver.swap_char(char, LETTERS.index(swapped))
+		selection.next(char)
+
+	return selection
+
+
+def init_worker(index_path: str):
+	global WORKER_DICTIONARY
+	WORKER_DICTIONARY = CompiledDictionary(index_path)
+
+
+def worker_board(key: BoardKey) -> SpellCastMap:
+	# the board is decoded (and its neighbour cache filled) once per worker, not once per chunk
+	global WORKER_BOARD
+	if WORKER_BOARD is None or WORKER_BOARD[0] != key:
+		WORKER_BOARD = (key, decode_board(key))
+
+	return WORKER_BOARD[1]
+
+
+def run_chunk(key: BoardKey, engine: str, swap_available: int, items: list,
+			  best_only: bool = True) -> tuple[float, list[PathKey]]:
+	start = time.perf_counter()
+	spellcast_m = worker_board(key)
+
+	if engine == "trie":
+		selections = solver.TrieSolver(WORKER_DICTIONARY.trie).solve(
+			spellcast_m, swap_available, [Vector(x, y) for x, y in items]
+		)
+	elif engine == "exhaustive":
+		words = [WORKER_DICTIONARY.words[word_id] for word_id in items]
+		selections = exhaustive.find_selection_exhaustive(spellcast_m, words, swap_available, best_only)
+	else:
+		words = [WORKER_DICTIONARY.words[word_id] for word_id in items]
+		selections = [selection for _, selection in iter_selections(spellcast_m, words, swap_available)]
+		if best_only:
+			selections = solver.best_per_word(selections)
+
+	return time.perf_counter() - start, [encode_path(selection) for selection in selections]
+
+
+class ParallelSolver:
+	workers: int
+	executor: futures.ProcessPoolExecutor
+
+	def __init__(self, word_dictionary: CompiledDictionary, workers: typing.Union[int, None] = None):
+		if workers is None or workers <= 0:
+			workers = os.cpu_count() or 1
+
+		self.workers = workers
+		# workers map the compiled dictionary themselves, the pages are shared through the os page cache
+		self.executor = futures.ProcessPoolExecutor(
+			max_workers=workers,
+			initializer=init_worker,
+			initargs=(os.path.abspath(word_dictionary.path),)
+		)
+
+	def solve(self, spellcast_m: SpellCastMap, engine: str, swap_available: int,
+			  word_ids: typing.Union[typing.Sequence[int], None] = None, best_only: bool = True) -> list[Selection]:
+		key = encode_board(spellcast_m)
+
+		if engine == "trie":
+			items = [(v.x, v.y) for v in spellcast_m.vector_map().keys()]
+			chunk = 1
+		else:
+			items = [int(word_id) for word_id in word_ids]
+			chunk = FIRST_CHUNK
+
+		paths = []
+		offset = 0
+		running = {}
+
+		while offset < len(items) or len(running) > 0:
+			while offset < len(items) and len(running) < self.workers * 2:
+				size = chunk
+				future = self.executor.submit(run_chunk, key, engine, swap_available, items[offset:offset + size],
+					best_only)
+				running[future] = size
+				offset += size
+
+			done, _ = futures.wait(running.keys(), return_when=futures.FIRST_COMPLETED)
+			for future in done:
+				size = running.pop(future)
+				elapsed, chunk_paths = future.result()
+				paths.extend(chunk_paths)
+
+				if engine != "trie":
+					# size the next chunks to take about CHUNK_SECONDS on a worker
+					rate = size / max(elapsed, 1e-6)
+					chunk = max(1, min(MAX_CHUNK, int(rate * CHUNK_SECONDS)))
+
+		selections = [decode_path(spellcast_m, path) for path in paths]
+		if engine != "trie":
+			# every word is in one chunk only, the chunks already kept their best paths
+			return selections
+
+		# start cells were split across workers, keep the best path per word like TrieSolver does
+		return solver.best_per_word(selections)
+
+	def shutdown(self):
+		self.executor.shutdown()
@@ -0,0 +1,120 @@
+import asyncio
+import time
+import typing
+
+import solver
+from navigator import Navigator
+from spellcast import *
+from trie import Trie
+
+
+class Candidate:
+	# a new best word, found is the perf_counter time the solver found it
+	word: str
+	value: float
+	selection: Selection
+	found: float
+
+	def __init__(self, word: str, value: float, selection: Selection, found: float):
+		self.word = word
+		self.value = value
+		self.selection = selection
+		self.found = found
+
+
+class PipelineResult:
+	chosen: typing.Union[Candidate, None]
+	reason: str
+	candidates: int
+	results: list[Selection]
+	expired: bool
+	started: float
+	drag_started: typing.Union[float, None]
+	drag_finished: typing.Union[float, None]
+
+	def __init__(self, started: float):
+		self.chosen = None
+		self.reason = "finished"  # why the word was chosen: "threshold", "deadline" or "finished"
+		self.candidates = 0
+		self.results = []
+		self.expired = False
+		self.started = started
+		self.drag_started = None
+		self.drag_finished = None
+
+	def to_dict(self) -> dict:
+		# seconds since the pipeline started
+		since = lambda moment: None if moment is None else round(moment - self.started, 6)
+		return {
+			"word": None if self.chosen is None else self.chosen.word,
+			"score": None if self.chosen is None else self.chosen.value,
+			"reason": self.reason,
+			"candidates": self.candidates,
+			"found": None if self.chosen is None else since(self.chosen.found),
+			"drag_started": since(self.drag_started),
+			"drag_finished": since(self.drag_finished),
+			"results": len(self.results),
+			"expired": self.expired,
+		}
+
+
+async def pick(queue: asyncio.Queue, threshold: typing.Union[float, None], deadline: typing.Union[float, None],
+			   result: PipelineResult) -> typing.Union[Candidate, None]:
+	# the first candidate that clears the threshold, else the best one at the deadline or when the solver is done
+	best = None
+	while True:
+		if not queue.empty():
+			candidate = queue.get_nowait()
+		else:
+			timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+			try:
+				candidate = await asyncio.wait_for(queue.get(), timeout)
+			except asyncio.TimeoutError:
+				result.reason = "deadline"
+				return best
+
+		if candidate is None:
+			result.reason = "finished"
+			return best
+
+		result.candidates += 1
+		best = candidate
+		if threshold is not None and candidate.value >= threshold:
+			result.reason = "threshold"
+			return best
+
+
+async def solve_and_navigate(trie: Trie, spellcast_m: SpellCastMap, nav: Navigator, swap_available: int = 0,
+							 threshold: typing.Union[float, None] = None, deadline_ms: typing.Union[float, None] = None,
+							 k: int = 100, nv_sleep: float = 0.0) -> PipelineResult:
+	# the top-k solver runs in a thread and streams every new best word, the word is dragged as soon as it is
+	# good enough while the search goes on for the result list
+	loop = asyncio.get_running_loop()
+	queue = asyncio.Queue()
+	result = PipelineResult(time.perf_counter())
+	deadline = None if deadline_ms is None else result.started + deadline_ms / 1000
+
+	def on_best(word: str, value: float, selection: Selection):
+		loop.call_soon_threadsafe(queue.put_nowait, Candidate(word, value, selection, time.perf_counter()))
+
+	top_solver = solver.TopKSolver(trie, k, deadline_ms, on_best)
+	solving = loop.run_in_executor(None, top_solver.solve, spellcast_m, swap_available)
+	# queued after every candidate of the solve, so it always comes last
+	solving.add_done_callback(lambda _: queue.put_nowait(None))
+
+	result.chosen = await pick(queue, threshold, deadline, result)
+	if result.chosen is not None:
+		result.drag_started = time.perf_counter()
+		await loop.run_in_executor(None, nav.navigate, result.chosen.selection, nv_sleep)
+		result.drag_finished = time.perf_counter()
+
+	result.results = await solving
+	result.expired = top_solver.expired
+
+	return result
+
+
+def run(trie: Trie, spellcast_m: SpellCastMap, nav: Navigator, swap_available: int = 0,
+		threshold: typing.Union[float, None] = None, deadline_ms: typing.Union[float, None] = None, k: int = 100,
+		nv_sleep: float = 0.0) -> PipelineResult:
+	return asyncio.run(solve_and_navigate(trie, spellcast_m, nav, swap_available, threshold, deadline_ms, k, nv_sleep))
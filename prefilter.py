@@ -0,0 +1,211 @@
+import typing
+
+import numpy
+
+from dictionary import CompiledDictionary
+from spellcast import LETTERS, LETTER_VALUES, SpellCastMap
+
+
+def encode_words(words: typing.Sequence[str]) -> tuple[numpy.ndarray, numpy.ndarray]:
+	blob = "".join(words).encode("ascii")
+	lengths = numpy.fromiter((len(word) for word in words), dtype=numpy.int64, count=len(words))
+	return numpy.frombuffer(blob, dtype=numpy.uint8), lengths
+
+
+def dictionary_arrays(word_dictionary: CompiledDictionary) -> tuple[numpy.ndarray, numpy.ndarray]:
+	return (
+		numpy.frombuffer(word_dictionary.words.blob, dtype=numpy.uint8),
+		numpy.frombuffer(word_dictionary.lengths, dtype=numpy.uint8).astype(numpy.int64)
+	)
+
+
+def dictionary_masks(word_dictionary: CompiledDictionary) -> numpy.ndarray:
+	# a copy, a view would keep the dictionary's mmap from being closed
+	return numpy.frombuffer(word_dictionary.masks, dtype=numpy.uint32).copy()
+
+
+# below this share of the words, a check gathers its rows for them instead of running over all words
+SUBSET_SHARE = 0.4
+
+
+def word_masks(blob: numpy.ndarray, lengths: numpy.ndarray) -> numpy.ndarray:
+	# bit n set when a word has the n-th letter, the same masks the compiled dictionary keeps
+	masks = numpy.zeros(len(lengths), dtype=numpy.uint32)
+	filled = lengths > 0
+	if filled.any():
+		starts = (numpy.cumsum(lengths) - lengths)[filled]
+		bits = numpy.left_shift(numpy.uint32(1), (blob.astype(numpy.int64) - ord("a")).astype(numpy.uint32))
+		masks[filled] = numpy.bitwise_or.reduceat(bits, starts)
+	return masks
+
+
+def board_histogram(spellcast_m: SpellCastMap) -> numpy.ndarray:
+	histogram = numpy.zeros(len(LETTERS), dtype=numpy.int16)
+	for char, positions in spellcast_m.map_by_char.items():
+		histogram[LETTERS.index(char)] = len(positions)
+
+	return histogram
+
+
+class LetterMaskFilter:
+	# distinct letters a word has and the board lacks, each of them costs a swap. A check on one number per word,
+	# most words of a board are out before their letters are counted
+	masks: numpy.ndarray
+
+	def __init__(self, masks: numpy.ndarray):
+		self.masks = masks
+
+	@staticmethod
+	def from_words(words: typing.Sequence[str]):
+		return LetterMaskFilter(word_masks(*encode_words(words)))
+
+	@staticmethod
+	def from_dictionary(word_dictionary: CompiledDictionary):
+		return LetterMaskFilter(dictionary_masks(word_dictionary))
+
+	def survivors(self, spellcast_m: SpellCastMap, swap_available: int) -> numpy.ndarray:
+		board = 0
+		for index, count in enumerate(board_histogram(spellcast_m)):
+			if count > 0:
+				board |= 1 << index
+
+		# at most swap_available absent letters: clearing that many lowest bits leaves nothing
+		absent = self.masks & numpy.uint32(~board & 0xFFFFFFFF)
+		for _ in range(swap_available):
+			absent &= absent - numpy.uint32(1)
+		return numpy.flatnonzero(absent == 0)
+
+
+class LetterCountFilter:
+	counts: numpy.ndarray
+
+	def __init__(self, blob: numpy.ndarray, lengths: numpy.ndarray):
+		word_ids = numpy.repeat(numpy.arange(len(lengths)), lengths)
+		cells = word_ids * len(LETTERS) + (blob.astype(numpy.int64) - ord("a"))
+		self.counts = numpy.bincount(cells, minlength=len(lengths) * len(LETTERS)) \
+			.reshape(len(lengths), len(LETTERS)).astype(numpy.uint8)
+
+	@staticmethod
+	def from_words(words: typing.Sequence[str]):
+		return LetterCountFilter(*encode_words(words))
+
+	@staticmethod
+	def from_dictionary(word_dictionary: CompiledDictionary):
+		return LetterCountFilter(*dictionary_arrays(word_dictionary))
+
+	def deficits(self, spellcast_m: SpellCastMap, word_ids: typing.Union[numpy.ndarray, None] = None) -> numpy.ndarray:
+		# letters each word (of word_ids) needs beyond the copies on the board, each of them costs a swap
+		if word_ids is not None and len(word_ids) >= SUBSET_SHARE * len(self.counts):
+			return self.deficits(spellcast_m)[word_ids]
+
+		counts = self.counts if word_ids is None else self.counts[word_ids]
+		missing = counts.astype(numpy.int16) - board_histogram(spellcast_m)
+		return numpy.maximum(missing, 0).sum(axis=1)
+
+	def survivors(self, spellcast_m: SpellCastMap, swap_available: int) -> numpy.ndarray:
+		return numpy.flatnonzero(self.deficits(spellcast_m) <= swap_available)
+
+
+class BigramFilter:
+	first: numpy.ndarray
+	second: numpy.ndarray
+	pair_words: numpy.ndarray
+	word_count: int
+
+	def __init__(self, blob: numpy.ndarray, lengths: numpy.ndarray):
+		codes = blob.astype(numpy.int64) - ord("a")
+		word_ids = numpy.repeat(numpy.arange(len(lengths)), lengths)
+
+		# consecutive letters of the flat blob that belong to the same word
+		inside = word_ids[:-1] == word_ids[1:]
+		self.first = codes[:-1][inside]
+		self.second = codes[1:][inside]
+		self.pair_words = word_ids[:-1][inside]
+		self.word_count = len(lengths)
+		# the pairs of a word follow each other
+		self.pair_counts = numpy.maximum(lengths - 1, 0)
+		self.pair_starts = numpy.cumsum(self.pair_counts) - self.pair_counts
+
+	@staticmethod
+	def from_words(words: typing.Sequence[str]):
+		return BigramFilter(*encode_words(words))
+
+	def infeasible(self, spellcast_m: SpellCastMap, word_ids: typing.Union[numpy.ndarray, None] = None) -> numpy.ndarray:
+		# bigrams each word (of word_ids) has and the board has no neighbours for
+		bigrams = numpy.array(spellcast_m.get_bigrams(), dtype=bool)
+		if word_ids is None or len(word_ids) >= SUBSET_SHARE * self.word_count:
+			missing = ~bigrams[self.first, self.second]
+			infeasible = numpy.bincount(self.pair_words[missing], minlength=self.word_count)
+			return infeasible if word_ids is None else infeasible[word_ids]
+
+		counts = self.pair_counts[word_ids]
+		offsets = numpy.cumsum(counts) - counts
+		pairs = numpy.arange(int(counts.sum())) + numpy.repeat(self.pair_starts[word_ids] - offsets, counts)
+		missing = ~bigrams[self.first[pairs], self.second[pairs]]
+		owners = numpy.repeat(numpy.arange(len(word_ids)), counts)
+		return numpy.bincount(owners[missing], minlength=len(word_ids))
+
+	def survivors(self, spellcast_m: SpellCastMap, swap_available: int) -> numpy.ndarray:
+		# a swapped cell can repair at most the two bigrams it is part of
+		return numpy.flatnonzero(self.infeasible(spellcast_m) <= 2 * swap_available)
+
+
+class Prefilter:
+	masks: LetterMaskFilter
+	letters: LetterCountFilter
+	bigrams: BigramFilter
+	total: int
+	after_masks: int
+	after_letters: int
+	after_bigrams: int
+
+	def __init__(self, blob: numpy.ndarray, lengths: numpy.ndarray, masks: typing.Union[numpy.ndarray, None] = None):
+		self.masks = LetterMaskFilter(masks if masks is not None else word_masks(blob, lengths))
+		self.letters = LetterCountFilter(blob, lengths)
+		self.bigrams = BigramFilter(blob, lengths)
+		self.total = len(lengths)
+		self.after_masks = 0
+		self.after_letters = 0
+		self.after_bigrams = 0
+
+	@staticmethod
+	def from_words(words: typing.Sequence[str]):
+		return Prefilter(*encode_words(words))
+
+	@staticmethod
+	def from_dictionary(word_dictionary: CompiledDictionary):
+		return Prefilter(*dictionary_arrays(word_dictionary), dictionary_masks(word_dictionary))
+
+	def survivors(self, spellcast_m: SpellCastMap, swap_available: int) -> numpy.ndarray:
+		# every check only looks at the words the previous one kept
+		candidates = self.masks.survivors(spellcast_m, swap_available)
+		self.after_masks = len(candidates)
+
+		candidates = candidates[self.letters.deficits(spellcast_m, candidates) <= swap_available]
+		self.after_letters = len(candidates)
+
+		candidates = candidates[self.bigrams.infeasible(spellcast_m, candidates) <= 2 * swap_available]
+		self.after_bigrams = len(candidates)
+
+		return candidates
+
+	def likely_first(self, spellcast_m: SpellCastMap, word_ids: typing.Sequence[int]) -> numpy.ndarray:
+		# word_ids with the words most likely on the board first: fewest letters the board lacks, then fewest
+		# neighbour pairs it lacks, then the most valuable per letter. A long word is worth more but rarely there
+		word_ids = numpy.asarray(word_ids, dtype=numpy.int64)
+		counts = self.letters.counts[word_ids]
+		lengths = numpy.maximum(counts.sum(axis=1), 1)
+		values = counts @ numpy.array([LETTER_VALUES[letter] for letter in LETTERS], dtype=numpy.float64)
+		order = numpy.lexsort((-values / lengths, self.bigrams.infeasible(spellcast_m, word_ids),
+							   self.letters.deficits(spellcast_m, word_ids)))
+		return word_ids[order]
+
+	def pruning_rate(self) -> float:
+		if self.total == 0:
+			return 0.0
+
+		return 1.0 - self.after_bigrams / self.total
+
+	def get_stats(self) -> str:
+		return f"{self.total} words -> {self.after_masks} after letter masks -> {self.after_letters} after letter " \
+			   f"counts -> {self.after_bigrams} after bigrams ({round(self.pruning_rate() * 100, 1)}% pruned)"
@@ -0,0 +1,109 @@
+import contextlib
+import functools
+import json
+import time
+import typing
+
+
+class Profiler:
+	# counts hot path calls by wrapping the methods while enabled, nothing is wrapped (and nothing costs) otherwise
+	enabled: bool
+	counters: dict[str, int]
+	phases: dict[str, float]
+	patched: list[tuple[object, str, object]]
+
+	def __init__(self):
+		self.enabled = False
+		self.counters = {}
+		self.phases = {}
+		self.patched = []
+
+	def enable(self):
+		if self.enabled:
+			return
+
+		import exhaustive
+		import spellcast
+		import wizard
+
+		self.enabled = True
+
+		def on_next(selection, char):
+			self.count("nodes_expanded")
+			if char.swapped:
+				self.count("swap_attempts")
+
+		self.wrap(spellcast.Selection, "next", on_next)
+		self.wrap(spellcast.Selection, "previous", lambda *args: self.count("backtracks"))
+		self.wrap(spellcast.Selection, "eliminate", lambda *args: self.count("eliminations"))
+		self.wrap(spellcast.Selection, "is_eliminated", lambda *args: self.count("elimination_lookups"))
+		self.wrap(wizard.FindWordWizard, "run", lambda *args: self.count("wizard_runs"))
+		self.wrap(exhaustive.ExhaustiveWordSearch, "search", lambda *args: self.count("nodes_expanded"))
+
+	def disable(self):
+		for owner, name, original in reversed(self.patched):
+			setattr(owner, name, original)
+
+		self.patched = []
+		self.enabled = False
+
+	def wrap(self, owner: object, name: str, before: typing.Callable):
+		original = getattr(owner, name)
+
+		@functools.wraps(original)
+		def wrapper(*args, **kwargs):
+			before(*args, **kwargs)
+			return original(*args, **kwargs)
+
+		self.patched.append((owner, name, original))
+		setattr(owner, name, wrapper)
+
+	def count(self, name: str, amount: int = 1):
+		self.counters[name] = self.counters.get(name, 0) + amount
+
+	@contextlib.contextmanager
+	def phase(self, name: str):
+		if not self.enabled:
+			yield
+			return
+
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add_phase(name, time.perf_counter() - start)
+
+	def add_phase(self, name: str, seconds: float):
+		if self.enabled:
+			self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+	def to_dict(self) -> dict:
+		return {
+			"phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+			"total": round(sum(self.phases.values()), 6),
+			"counters": dict(sorted(self.counters.items())),
+		}
+
+	def table(self) -> str:
+		total = sum(self.phases.values())
+		rows = [("phase", "seconds", "share")]
+		for name, seconds in self.phases.items():
+			rows.append((name, f"{seconds:.4f}", f"{seconds / total * 100:.1f}%" if total > 0 else "-"))
+		rows.append(("total", f"{total:.4f}", ""))
+
+		rows.append(("", "", ""))
+		rows.append(("counter", "count", ""))
+		for name, amount in sorted(self.counters.items()):
+			rows.append((name, str(amount), ""))
+
+		widths = [max(len(row[column]) for row in rows) for column in range(3)]
+		return "\n".join(
+			f"{row[0].ljust(widths[0])}  {row[1].rjust(widths[1])}  {row[2].rjust(widths[2])}".rstrip() for row in rows
+		)
+
+	def write(self, path: str):
+		with open(path, "w", encoding="utf-8") as f:
+			json.dump(self.to_dict(), f, indent=4)
+
+
+PROFILER = Profiler()
@@ -0,0 +1,19 @@
+# what the daemon and its clients agree on: where it listens, its paths, the engines and defaults of a request and
+# the status codes of its answers. Kept apart so a client loads none of the solver
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+REQUEST_TIMEOUT = 30.0  # seconds
+RESULT_LIMIT = 100  # results per board, also of the --batch json lines
+ENGINES = ["trie", "wizard", "exhaustive"]
+
+SOLVE_PATH = "/solve"
+STATS_PATH = "/stats"
+HEALTH_PATH = "/health"
+
+OK = 200
+BAD_REQUEST = 400
+NOT_FOUND = 404
+SERVER_ERROR = 500
+QUEUE_FULL = 503
+TIMED_OUT = 504
@@ -0,0 +1,267 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy
+
+import batch
+import logger
+from navigator import MockDevice, Navigator
+from spellcast import *
+
+LOGGER = logger.Logger("Recognize")
+
+DEFAULT_TEMPLATES = "./glyphs.npz"
+
+GLYPH_SIZE = 16  # cells are compared at GLYPH_SIZE x GLYPH_SIZE
+SUPERSAMPLE = 3  # pixels averaged per glyph pixel and axis
+
+# parts of a cell as (left, top, right, bottom) fractions: the letter in the middle, the badge in the top left corner
+LETTER_BOX = (0.25, 0.25, 0.75, 0.75)
+BADGE_BOX = (0.0, 0.0, 0.32, 0.32)
+
+# a cell with a lower correlation to its best template is asked for instead
+MIN_SCORE = 0.6
+
+NO_BADGE = "none"
+# badge label -> the cell text suffix in the map format
+BADGES = {NO_BADGE: "", "2": " 2", "3": " 3", "double": " 1 true"}
+
+
+def grayscale(image) -> numpy.ndarray:
+	# PIL image -> float32 array of (height, width)
+	return numpy.asarray(image.convert("L"), dtype=numpy.float32)
+
+
+def load_image(path: str) -> numpy.ndarray:
+	from PIL import Image
+	with Image.open(path) as image:
+		return grayscale(image)
+
+
+def cell_regions(nav: Navigator, origin: Vector) -> numpy.ndarray:
+	# (cells, 4) x, y, width, height of every cell in the image, cells in input order (x first)
+	size = nav.board_size
+	regions = numpy.array([nav.get_region(cell % size, cell // size) for cell in range(size * size)],
+						  dtype=numpy.float64)
+	regions[:, 0] -= origin.x
+	regions[:, 1] -= origin.y
+	return regions
+
+
+def sample(image: numpy.ndarray, regions: numpy.ndarray, box: tuple[float, float, float, float]) -> numpy.ndarray:
+	# (cells, GLYPH_SIZE * GLYPH_SIZE) of the box part of every cell, all cells are resampled in one indexing step
+	steps = (numpy.arange(GLYPH_SIZE * SUPERSAMPLE) + 0.5) / (GLYPH_SIZE * SUPERSAMPLE)
+	left = regions[:, 0] + regions[:, 2] * box[0]
+	top = regions[:, 1] + regions[:, 3] * box[1]
+	xs = (left[:, None] + (regions[:, 2] * (box[2] - box[0]))[:, None] * steps).astype(numpy.int64)
+	ys = (top[:, None] + (regions[:, 3] * (box[3] - box[1]))[:, None] * steps).astype(numpy.int64)
+	xs = numpy.clip(xs, 0, image.shape[1] - 1)
+	ys = numpy.clip(ys, 0, image.shape[0] - 1)
+
+	pixels = image[ys[:, :, None], xs[:, None, :]]
+	pixels = pixels.reshape(len(regions), GLYPH_SIZE, SUPERSAMPLE, GLYPH_SIZE, SUPERSAMPLE).mean(axis=(2, 4))
+	return pixels.reshape(len(regions), -1)
+
+
+def normalize(samples: numpy.ndarray) -> numpy.ndarray:
+	# zero mean, unit length rows: a dot product is then the correlation, whatever the brightness and contrast
+	centered = samples - samples.mean(axis=1, keepdims=True)
+	return centered / numpy.maximum(numpy.linalg.norm(centered, axis=1, keepdims=True), 1e-6)
+
+
+class Templates:
+	# averaged normalized glyphs per label, the counts let later screenshots refine them
+	letters: dict[str, numpy.ndarray]
+	badges: dict[str, numpy.ndarray]
+	counts: dict[str, int]
+
+	def __init__(self):
+		self.letters = {}
+		self.badges = {}
+		self.counts = {}
+
+	def add(self, kind: str, label: str, glyphs: numpy.ndarray):
+		templates = self.letters if kind == "letter" else self.badges
+		key = f"{kind}_{label}"
+		count = self.counts.get(key, 0)
+		total = glyphs.sum(axis=0)
+		if count > 0:
+			total = total + templates[label] * count
+
+		self.counts[key] = count + len(glyphs)
+		templates[label] = total / self.counts[key]
+
+	def matrix(self, kind: str) -> tuple[list[str], numpy.ndarray]:
+		templates = self.letters if kind == "letter" else self.badges
+		labels = sorted(templates.keys())
+		if len(labels) == 0:
+			return labels, numpy.zeros((0, GLYPH_SIZE * GLYPH_SIZE), dtype=numpy.float32)
+
+		return labels, normalize(numpy.stack([templates[label] for label in labels]))
+
+	def save(self, path: str):
+		arrays = {f"letter_{label}": glyph for label, glyph in self.letters.items()}
+		arrays.update({f"badge_{label}": glyph for label, glyph in self.badges.items()})
+		arrays.update({f"count_{key}": numpy.array(count) for key, count in self.counts.items()})
+		with open(path, "wb") as f:
+			numpy.savez_compressed(f, glyph_size=numpy.array(GLYPH_SIZE), **arrays)
+
+	@staticmethod
+	def load(path: str):
+		templates = Templates()
+		with numpy.load(path) as data:
+			if int(data["glyph_size"]) != GLYPH_SIZE:
+				raise Exception(f"{path} has {int(data['glyph_size'])}px glyphs, learn them again")
+
+			for key in data.files:
+				if key.startswith("letter_"):
+					templates.letters[key[len("letter_"):]] = data[key]
+				elif key.startswith("badge_"):
+					templates.badges[key[len("badge_"):]] = data[key]
+				elif key.startswith("count_"):
+					templates.counts[key[len("count_"):]] = int(data[key])
+
+		return templates
+
+
+TEMPLATES_BY_PATH: dict[str, tuple[float, Templates]] = {}
+
+
+def get_templates(path: str = DEFAULT_TEMPLATES) -> Templates:
+	# loaded once per file version
+	if not os.path.exists(path):
+		raise Exception(f"no glyph templates at {path}, learn them first with python3 recognize.py learn")
+
+	modified = os.path.getmtime(path)
+	if path not in TEMPLATES_BY_PATH or TEMPLATES_BY_PATH[path][0] != modified:
+		TEMPLATES_BY_PATH[path] = (modified, Templates.load(path))
+
+	return TEMPLATES_BY_PATH[path][1]
+
+
+def badge_label(text: str) -> str:
+	_, multiplier, mark_double = batch.parse_cell(text)
+	if mark_double:
+		return "double"
+	if multiplier > 1.0:
+		return str(int(multiplier))
+	return NO_BADGE
+
+
+def learn(templates: Templates, image: numpy.ndarray, regions: numpy.ndarray, cells: list[str]):
+	# adds the glyphs of a screenshot whose board is known
+	if len(cells) != len(regions):
+		raise Exception(f"the board has {len(regions)} cells, got {len(cells)}")
+
+	letters = normalize(sample(image, regions, LETTER_BOX))
+	badges = normalize(sample(image, regions, BADGE_BOX))
+	for kind, glyphs, labels in [
+		("letter", letters, [batch.parse_cell(text)[0] for text in cells]),
+		("badge", badges, [badge_label(text) for text in cells]),
+	]:
+		for label in set(labels):
+			templates.add(kind, label, glyphs[[index for index, other in enumerate(labels) if other == label]])
+
+
+def classify(templates: Templates, image: numpy.ndarray, regions: numpy.ndarray) -> tuple[list[str], numpy.ndarray]:
+	# cell texts in the map format and the confidence of each cell, one matrix product per glyph kind
+	letter_labels, letter_matrix = templates.matrix("letter")
+	badge_labels, badge_matrix = templates.matrix("badge")
+	if len(letter_labels) == 0:
+		raise Exception("no letter templates learned yet")
+
+	letter_scores = normalize(sample(image, regions, LETTER_BOX)) @ letter_matrix.T
+	letters = letter_scores.argmax(axis=1)
+	confidence = letter_scores.max(axis=1)
+
+	badges = [NO_BADGE] * len(regions)
+	if len(badge_labels) > 0:
+		badge_scores = normalize(sample(image, regions, BADGE_BOX)) @ badge_matrix.T
+		badges = [badge_labels[index] for index in badge_scores.argmax(axis=1)]
+		confidence = numpy.minimum(confidence, badge_scores.max(axis=1))
+
+	cells = [letter_labels[letter] + BADGES[badge] for letter, badge in zip(letters, badges)]
+	return cells, confidence
+
+
+def capture(nav: Navigator) -> tuple[numpy.ndarray, Vector]:
+	# one screenshot of the whole board and its top left corner on the screen
+	import pyautogui
+	size = nav.board_size
+	left, top, _, _ = nav.get_region(0, 0)
+	right, bottom, width, height = nav.get_region(size - 1, size - 1)
+	origin = Vector(int(left), int(top))
+	image = pyautogui.screenshot(region=(origin.x, origin.y, math.ceil(right + width - origin.x),
+										 math.ceil(bottom + height - origin.y)))
+	return grayscale(image), origin
+
+
+def read_screen(nav: Navigator, path: str = DEFAULT_TEMPLATES) -> tuple[list[str], numpy.ndarray]:
+	image, origin = capture(nav)
+	return classify(get_templates(path), image, cell_regions(nav, origin))
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="learn glyph templates from known boards and read boards from screenshots")
+	parser.add_argument("command", choices=["learn", "read"])
+	parser.add_argument("screenshot", help="saved screenshot, - to capture the screen")
+	parser.add_argument("board", nargs="?", default=None,
+						help="learn: the board in the screenshot, read: the expected board to check against")
+	parser.add_argument("--templates", default=DEFAULT_TEMPLATES)
+	parser.add_argument("--size", type=int, default=5, help="board side length")
+	parser.add_argument("--origin", type=float, nargs=2, default=None, metavar=("X", "Y"),
+						help="top left corner of the board in the screenshot (default: the saved window corner)")
+	parser.add_argument("--gap", type=float, default=None)
+	parser.add_argument("--button-size", type=float, default=None)
+	args = parser.parse_args()
+
+	try:
+		if args.screenshot == "-":
+			import window
+			nav = Navigator(window.load_default(), args.size, args.gap, args.button_size)
+			image, origin = capture(nav)
+		else:
+			if args.origin is not None:
+				nav = Navigator.at(Vector(*args.origin), args.size, args.gap, args.button_size, MockDevice())
+			else:
+				import window
+				nav = Navigator(window.load_default(), args.size, args.gap, args.button_size, MockDevice())
+			image, origin = load_image(args.screenshot), Vector(0, 0)
+		regions = cell_regions(nav, origin)
+
+		expected = None
+		if args.board is not None:
+			with open(args.board, "r", encoding="utf-8") as f:
+				expected = next(batch.read_records(f))[1]
+
+		if args.command == "learn":
+			if expected is None:
+				raise Exception("learn needs the board shown in the screenshot")
+
+			templates = Templates.load(args.templates) if os.path.exists(args.templates) else Templates()
+			learn(templates, image, regions, expected)
+			templates.save(args.templates)
+			LOGGER.info(f"{len(templates.letters)} letters and {len(templates.badges)} badges in {args.templates}")
+		else:
+			start = time.perf_counter()
+			cells, confidence = classify(get_templates(args.templates), image, regions)
+			elapsed = time.perf_counter() - start
+			print("\n".join(cells))
+			for index in numpy.flatnonzero(confidence < MIN_SCORE):
+				LOGGER.warning(f"({index % args.size}, {index // args.size}) is uncertain ({round(float(confidence[index]), 2)})")
+			LOGGER.info(f"Read in {round(elapsed * 1000, 2)}ms")
+
+			if expected is not None:
+				wrong = [index for index, (cell, other) in enumerate(zip(cells, expected))
+						 if batch.parse_cell(cell) != batch.parse_cell(other)]
+				for index in wrong:
+					LOGGER.warning(f"({index % args.size}, {index // args.size}) read \"{cells[index]}\", expected \"{expected[index]}\"")
+				if len(wrong) > 0:
+					sys.exit(1)
+				LOGGER.info("Matches the expected board")
+	except Exception as e:
+		LOGGER.warning(str(e))
+		sys.exit(1)
@@ -0,0 +1,92 @@
+import itertools
+import typing
+
+import numpy
+
+from spellcast import Selection, SpellCastMap
+
+
+class PathBatch:
+	# candidate paths as a padded cell index matrix, -1 past the end of each path
+	cells: numpy.ndarray
+	lengths: numpy.ndarray
+	swapped: numpy.ndarray
+
+	def __init__(self, cells: numpy.ndarray, lengths: numpy.ndarray, swapped: typing.Union[numpy.ndarray, None] = None):
+		self.cells = cells
+		self.lengths = lengths
+		self.swapped = numpy.zeros(cells.shape, dtype=bool) if swapped is None else swapped
+
+	def __len__(self) -> int:
+		return len(self.lengths)
+
+	def valid(self) -> numpy.ndarray:
+		return numpy.arange(self.cells.shape[1]) < self.lengths[:, None]
+
+	@staticmethod
+	def from_paths(paths: typing.Sequence[typing.Sequence[int]],
+				   swapped: typing.Union[typing.Sequence[typing.Sequence[bool]], None] = None):
+		# ragged paths, swapped marks the chars that were swapped in (they score nothing)
+		lengths = numpy.fromiter((len(path) for path in paths), dtype=numpy.int64, count=len(paths))
+		longest = int(lengths.max()) if len(paths) > 0 else 0
+		total = int(lengths.sum())
+
+		valid = numpy.arange(longest) < lengths[:, None]
+		cells = numpy.full((len(paths), longest), -1, dtype=numpy.int64)
+		cells[valid] = numpy.fromiter(itertools.chain.from_iterable(paths), dtype=numpy.int64, count=total)
+
+		mask = None
+		if swapped is not None:
+			mask = numpy.zeros((len(paths), longest), dtype=bool)
+			mask[valid] = numpy.fromiter(itertools.chain.from_iterable(swapped), dtype=bool, count=total)
+
+		return PathBatch(cells, lengths, mask)
+
+	@staticmethod
+	def from_selections(selections: typing.Sequence[Selection]):
+		return PathBatch.from_paths(
+			[[char.cell for char in selection.path] for selection in selections],
+			[[char.swapped for char in selection.path] for selection in selections]
+		)
+
+
+class BoardScorer:
+	# per cell arrays of one board, filled from the chars the factory made so the scores match get_total_value
+	values: numpy.ndarray
+	doubles: numpy.ndarray
+	letters: numpy.ndarray
+
+	def __init__(self, spellcast_m: SpellCastMap):
+		board = spellcast_m.board
+		self.values = numpy.array(board.values, dtype=numpy.float64) * numpy.array(board.multipliers, dtype=numpy.float64)
+		self.doubles = numpy.array([(board.doubles >> cell) & 1 == 1 for cell in range(len(board.cells))], dtype=bool)
+		self.letters = numpy.array(board.letters, dtype=numpy.int64)
+
+	def score(self, batch: PathBatch) -> numpy.ndarray:
+		if len(batch) == 0:
+			return numpy.zeros(0, dtype=numpy.float64)
+
+		valid = batch.valid()
+		cells = numpy.where(valid, batch.cells, 0)
+		values = numpy.where(valid & ~batch.swapped, self.values[cells], 0.0)
+
+		# added column by column: the same order as Selection.sums, so the float results are identical
+		total = numpy.zeros(len(batch), dtype=numpy.float64)
+		for column in range(values.shape[1]):
+			total += values[:, column]
+
+		total = numpy.where((valid & self.doubles[cells]).any(axis=1), total * 2, total)
+		return numpy.where(batch.lengths >= 6, total + 10, total)
+
+	def swapped(self, batch: PathBatch, words: typing.Sequence[str]) -> numpy.ndarray:
+		# chars of each path that differ from the word it spells, words[i] belongs to path i
+		codes = numpy.full(batch.cells.shape, -1, dtype=numpy.int64)
+		blob = numpy.frombuffer("".join(words).encode("ascii"), dtype=numpy.uint8).astype(numpy.int64) - ord("a")
+		valid = batch.valid()
+		codes[valid] = blob
+
+		return valid & (self.letters[numpy.where(valid, batch.cells, 0)] != codes)
+
+
+def score_selections(spellcast_m: SpellCastMap, selections: typing.Sequence[Selection]) -> numpy.ndarray:
+	return BoardScorer(spellcast_m).score(PathBatch.from_selections(selections))
@@ -0,0 +1,538 @@
+import heapq
+import itertools
+import time
+
+from spellcast import *
+from trie import Trie, ROOT, NO_NODE, NO_WORD, MAX_SHARDS, popcount
+
+
+def swap_char(source: SpellCastChar, code: int) -> SpellCastChar:
+	char = SpellCastChar(source.v, SingleChar(LETTERS[code]), 0, source.multiplier, source.mark_double)
+	char.cell = source.cell
+	char.swapped = True
+	char.swapped_from = source
+	return char
+
+
+def copy_selection(selection: Selection) -> Selection:
+	result = Selection()
+	for char in selection.path:
+		result.next(char)
+
+	return result
+
+
+def best_per_word(selections: typing.Iterable[Selection]) -> list[Selection]:
+	# the highest scoring path of each word, the first one found wins a tie
+	best = {}
+	for selection in selections:
+		word = selection.get_raw_text()
+		if not (word in best) or selection.get_total_value() > best[word].get_total_value():
+			best[word] = selection
+
+	return list(best.values())
+
+
+class TrieSolver:
+	trie: Trie
+	found: dict[str, Selection]
+	found_value: dict[str, float]
+
+	def __init__(self, trie: Trie):
+		self.trie = trie
+		self.found = {}
+		self.found_value = {}
+
+	def solve(self, spellcast_m: SpellCastMap, swap_available: int = 0,
+			  starts: typing.Union[list[Vector], None] = None) -> list[Selection]:
+		self.found = {}
+		self.found_value = {}
+
+		if starts is None:
+			starts = list(spellcast_m.vector_map().keys())
+
+		board = spellcast_m.board
+		for v in starts:
+			cell = board.index(v.x, v.y)
+			if board.is_filled(cell):
+				self.enter(board, Selection(), cell, ROOT, swap_available)
+
+		return list(self.found.values())
+
+	def enter(self, board: Board, selection: Selection, cell: int, node: int, swaps: int):
+		trie = self.trie
+		code = board.letters[cell]
+
+		child = trie.child(node, code)
+		if child != NO_NODE:
+			selection.next(board.cells[cell])
+			self.visit(board, selection, cell, child, swaps)
+			selection.previous()
+
+		if swaps > 0:
+			for swap_code, swap_child in trie.children(node):
+				if swap_code == code:
+					continue
+
+				selection.next(swap_char(board.cells[cell], swap_code))
+				self.visit(board, selection, cell, swap_child, swaps - 1)
+				selection.previous()
+
+	def visit(self, board: Board, selection: Selection, cell: int, node: int, swaps: int):
+		trie = self.trie
+
+		if trie.terminal[node] != NO_WORD:
+			self.record(trie.words[trie.terminal[node]], selection)
+
+		if trie.child_mask[node] == 0:
+			return
+
+		for neighbour in board.neighbour_cells[cell]:
+			if board.letters[neighbour] >= 0 and not (selection.visited >> neighbour) & 1:
+				self.enter(board, selection, neighbour, node, swaps)
+
+	def record(self, word: str, selection: Selection):
+		value = selection.get_total_value()
+		if word in self.found_value and self.found_value[word] >= value:
+			return
+
+		self.found[word] = copy_selection(selection)
+		self.found_value[word] = value
+
+
+def suffix_values(trie: Trie, letter_values: list[list[float]]) -> list[typing.Sequence[float]]:
+	# per letter values -> per node, the highest sum of them over the remaining letters of a word below the node.
+	# -inf when every word below has a letter worth -inf. One vectorised pass per trie level, deepest first
+	# numpy only loads for the top-k tables with swaps, a plain trie solve starts without it
+	import numpy
+
+	child_mask = numpy.frombuffer(trie.child_mask, dtype=numpy.uint32)
+	first_child = numpy.frombuffer(trie.first_child, dtype=numpy.int32)
+	letter = numpy.frombuffer(trie.letter, dtype=numpy.uint8)
+	terminal = numpy.frombuffer(trie.terminal, dtype=numpy.int32) != NO_WORD
+
+	# breadth first: the children of a level are the nodes right after it
+	levels = []
+	lo, hi = ROOT, ROOT + 1
+	while True:
+		parents = lo + numpy.flatnonzero(child_mask[lo:hi])
+		if len(parents) == 0:
+			break
+		last = int(parents[-1])
+		lo, hi = hi, trie.first_child[last] + popcount(trie.child_mask[last])
+		levels.append((parents, lo, hi))
+
+	tables = []
+	for values in letter_values:
+		values = numpy.array(values, dtype=numpy.float64)
+		best = numpy.where(terminal, 0.0, -numpy.inf)
+		for parents, lo, hi in reversed(levels):
+			below = numpy.maximum.reduceat(values[letter[lo:hi]] + best[lo:hi], first_child[parents] - lo)
+			best[parents] = numpy.maximum(best[parents], below)
+		tables.append(memoryview(best))
+
+	return tables
+
+
+# the clock is read once per this many entered cells
+DEADLINE_CHECK = 256
+
+
+class DeadlineReached(Exception):
+	pass
+
+
+class TopResults:
+	# best path per word, bounded to the k best words. Paths can be offered as they are found, memory stays at k
+	k: int
+	heap: list[tuple[float, int, str]]
+	best: dict[str, tuple[float, Selection]]
+	offered: int
+
+	def __init__(self, k: int):
+		self.k = k
+		self.heap = []
+		self.best = {}
+		self.counter = itertools.count()
+		self.offered = 0
+
+	def is_full(self) -> bool:
+		return len(self.best) >= self.k
+
+	def threshold(self) -> float:
+		# score a new word has to beat to get in
+		if not self.is_full():
+			return float("-inf")
+
+		return self.heap[0][0]
+
+	def offer(self, word: str, value: float, selection: typing.Callable[[], Selection]) -> bool:
+		self.offered += 1
+		if word in self.best:
+			if self.best[word][0] >= value:
+				return False
+			self.heap = [entry for entry in self.heap if entry[2] != word]
+			heapq.heapify(self.heap)
+		elif self.is_full():
+			if value <= self.heap[0][0]:
+				return False
+			_, _, evicted = heapq.heappop(self.heap)
+			del self.best[evicted]
+
+		heapq.heappush(self.heap, (value, next(self.counter), word))
+		self.best[word] = (value, selection())
+		return True
+
+	def results(self) -> list[Selection]:
+		ranked = sorted(self.best.items(), key=lambda item: item[1][0], reverse=True)
+		return [selection for _, (_, selection) in ranked]
+
+
+class TopKSolver(TrieSolver):
+	results: TopResults
+	ranked: list[tuple[float, int]]
+	depth_values: list[float]
+	strict: typing.Union[typing.Sequence[float], None]
+	loose: typing.Union[typing.Sequence[float], None]
+	double_letters: int
+	ordered_neighbours: list[list[int]]
+	deadline_ms: typing.Union[float, None]
+	deadline: typing.Union[float, None]
+	expired: bool
+	listener: typing.Union[typing.Callable[[str, float, Selection], None], None]
+	best_value: float
+
+	def __init__(self, trie: Trie, k: int, deadline_ms: typing.Union[float, None] = None,
+				 listener: typing.Union[typing.Callable[[str, float, Selection], None], None] = None):
+		super().__init__(trie)
+		self.k = k
+		self.results = TopResults(k)
+		self.ranked = []
+		self.depth_values = [0.0]
+		self.strict = None
+		self.loose = None
+		self.double_letters = 0
+		self.ordered_neighbours = []
+		self.deadline_ms = deadline_ms
+		self.deadline = None
+		self.expired = False
+		self.steps = 0
+		# called from the solving thread with every new best word
+		self.listener = listener
+		self.best_value = 0.0
+
+	def solve(self, spellcast_m: SpellCastMap, swap_available: int = 0,
+			  starts: typing.Union[list[Vector], None] = None) -> list[Selection]:
+		self.results = TopResults(self.k)
+		self.expired = False
+		self.steps = 0
+		self.best_value = 0.0
+		self.deadline = None
+		if self.deadline_ms is not None:
+			self.deadline = time.perf_counter() + self.deadline_ms / 1000
+
+		board = spellcast_m.board
+		value = lambda cell: board.values[cell] * board.multipliers[cell]
+
+		# high value cells first, so the k-th best score rises early and prunes more
+		self.ranked = sorted(
+			[(value(cell), cell) for cell in range(len(board.cells)) if board.is_filled(cell)], reverse=True
+		)
+		self.double_letters = 0
+		for _, cell in self.ranked:
+			if (board.doubles >> cell) & 1:
+				self.double_letters |= 1 << board.letters[cell]
+
+		# r more letters are worth at most the r best cells
+		self.depth_values = list(itertools.accumulate([cell_value for cell_value, _ in self.ranked], initial=0.0))
+
+		# per node bounds pay off on the long walks swaps make, without them the walk costs less than the tables.
+		# A letter is worth its best cell, one the board lacks can only be played as a swap worth nothing
+		self.strict = None
+		self.loose = None
+		if swap_available > 0:
+			strict = [float("-inf")] * len(LETTERS)
+			for cell_value, cell in self.ranked:
+				strict[board.letters[cell]] = max(strict[board.letters[cell]], cell_value)
+			self.strict, self.loose = suffix_values(self.trie, [strict, [max(value, 0.0) for value in strict]])
+		self.ordered_neighbours = [sorted(neighbours, key=value, reverse=True) for neighbours in board.neighbour_cells]
+
+		if starts is None:
+			starts = [board.vector(cell) for _, cell in self.ranked]
+
+		try:
+			super().solve(spellcast_m, swap_available, starts)
+		except DeadlineReached:
+			# the walk is abandoned where it is, everything recorded so far stays valid
+			self.expired = True
+
+		return self.results.results()
+
+	def best(self) -> list[Selection]:
+		# best words found so far, also while solving
+		return self.results.results()
+
+	def bound(self, board: Board, visited: int, length: int, path_value: float, node: int, swaps: int) -> float:
+		# optimistic score of any word below node: the best cells for as many letters as it can still get, and its
+		# remaining letters on their best cells regardless of where those are. The word is doubled if a
+		# double-points cell is used or still usable, and gets the 6+ letter bonus if it can still get that long
+		trie = self.trie
+		below = self.depth_values[min(trie.max_depth[node], len(self.ranked))]
+		if self.strict is not None:
+			below = min(below, (self.loose if swaps > 0 else self.strict)[node])
+		value = path_value + below
+
+		if board.doubles & visited or (board.doubles and (swaps > 0 or trie.suffix_mask[node] & self.double_letters)):
+			value *= 2
+
+		if length + trie.max_depth[node] >= 6:
+			value += 10
+
+		return value
+
+	def enter(self, board: Board, selection: Selection, cell: int, node: int, swaps: int):
+		self.steps += 1
+		if self.deadline is not None and self.steps % DEADLINE_CHECK == 0 and time.perf_counter() >= self.deadline:
+			raise DeadlineReached()
+
+		trie = self.trie
+		code = board.letters[cell]
+
+		child = trie.child(node, code)
+		if child != NO_NODE:
+			selection.next(board.cells[cell])
+			self.visit(board, selection, cell, child, swaps)
+			selection.previous()
+
+		if swaps <= 0:
+			return
+
+		# one bound for the whole swap fan-out, taken at node with the swap still in hand: the swapped letter can
+		# be any letter and is worth nothing
+		if self.results.is_full() and self.bound(board, selection.visited | (1 << cell), selection.length,
+				selection.get_path_value(), node, swaps) <= self.results.threshold():
+			return
+
+		for swap_code, swap_child in trie.children(node):
+			if swap_code == code:
+				continue
+
+			selection.next(swap_char(board.cells[cell], swap_code))
+			self.visit(board, selection, cell, swap_child, swaps - 1)
+			selection.previous()
+
+	def visit(self, board: Board, selection: Selection, cell: int, node: int, swaps: int):
+		trie = self.trie
+
+		if trie.terminal[node] != NO_WORD:
+			self.record(trie.words[trie.terminal[node]], selection)
+
+		if trie.child_mask[node] == 0:
+			return
+
+		if self.results.is_full() and self.bound(board, selection.visited, selection.length, selection.get_path_value(),
+				node, swaps) <= self.results.threshold():
+			return
+
+		for neighbour in self.ordered_neighbours[cell]:
+			if board.letters[neighbour] >= 0 and not (selection.visited >> neighbour) & 1:
+				self.enter(board, selection, neighbour, node, swaps)
+
+	def record(self, word: str, selection: Selection):
+		value = selection.get_total_value()
+		if self.results.offer(word, value, lambda: copy_selection(selection)) and self.listener is not None \
+				and value > self.best_value:
+			self.best_value = value
+			self.listener(word, value, self.results.best[word][1])
+
+
+class TieredSolver(TrieSolver):
+	# only the words of the allowed shards. solve_tiers searches one dictionary tier after the other, most common
+	# first: their best words are there almost at once and the deadline cuts off the long tail
+	allowed: int
+	later: int
+	masks: list[int]
+	current: int
+	parked: list[list[tuple[list[SpellCastChar], SpellCastChar, int, int, int]]]
+	visits: int
+	pushed: list[int]
+	parent: tuple[int, int]
+	parent_path: list[SpellCastChar]
+	shard_tiers: list[int]
+	word_tiers: dict[str, int]
+	deadline_ms: typing.Union[float, None]
+	deadline: typing.Union[float, None]
+	expired: bool
+	steps: int
+
+	def __init__(self, trie: Trie, allowed: typing.Union[int, None] = None,
+				 deadline_ms: typing.Union[float, None] = None):
+		super().__init__(trie)
+		self.allowed = allowed if allowed is not None else (1 << MAX_SHARDS) - 1
+		self.later = 0
+		self.masks = []
+		self.current = 0
+		self.parked = []
+		self.visits = 0
+		self.pushed = []
+		self.parent = (-1, -1)
+		self.parent_path = []
+		self.shard_tiers = [0] * MAX_SHARDS
+		self.word_tiers = {}
+		self.deadline_ms = deadline_ms
+		self.deadline = None
+		self.expired = False
+		self.steps = 0
+
+	def start_clock(self):
+		self.expired = False
+		self.steps = 0
+		self.deadline = None
+		if self.deadline_ms is not None:
+			self.deadline = time.perf_counter() + self.deadline_ms / 1000
+
+	def search(self, spellcast_m: SpellCastMap, swap_available: int,
+			   starts: typing.Union[list[Vector], None]) -> list[Selection]:
+		try:
+			return super().solve(spellcast_m, swap_available, starts)
+		except DeadlineReached:
+			self.expired = True
+			return list(self.found.values())
+
+	def solve(self, spellcast_m: SpellCastMap, swap_available: int = 0,
+			  starts: typing.Union[list[Vector], None] = None) -> list[Selection]:
+		self.start_clock()
+		self.pushed = [0] * (len(spellcast_m.board.cells) + 1)
+		return self.search(spellcast_m, swap_available, starts)
+
+	def solve_tiers(self, spellcast_m: SpellCastMap, tiers: list[tuple[int, int]], swap_available: int = 0) \
+			-> typing.Iterator[tuple[int, list[Selection]]]:
+		# (tier, its words) for every (tier, shard mask) as soon as it is searched, up to the tier the deadline hit.
+		# A branch without words of the current tier is parked and resumed by the first tier that has some below
+		# it, so every path is walked once over all tiers. Words of later tiers met on the way are kept for them
+		self.start_clock()
+		self.found = {}
+		self.found_value = {}
+		self.word_tiers = {}
+		allowed = self.allowed
+		self.masks = [allowed & mask for _, mask in tiers]
+		self.parked = [[] for _ in tiers]
+		for tier, mask in tiers:
+			for shard in range(MAX_SHARDS):
+				if (mask >> shard) & 1:
+					self.shard_tiers[shard] = tier
+
+		board = spellcast_m.board
+		self.pushed = [0] * (len(board.cells) + 1)
+		self.parent = (-1, -1)
+		try:
+			for index, (tier, _) in enumerate(tiers):
+				self.current = index
+				self.allowed = self.masks[index]
+				self.later = 0
+				for mask in self.masks[index + 1:]:
+					self.later |= mask
+
+				try:
+					self.resume(board, swap_available, index == 0)
+				except DeadlineReached:
+					self.expired = True
+
+				yield tier, [self.found[word] for word, word_tier in self.word_tiers.items() if word_tier == tier]
+				if self.expired:
+					break
+		finally:
+			self.allowed = allowed
+			self.later = 0
+			self.parked = []
+
+	def resume(self, board: Board, swap_available: int, first: bool):
+		if first:
+			for cell in range(len(board.cells)):
+				if board.is_filled(cell):
+					self.enter(board, Selection(), cell, ROOT, swap_available)
+
+		# siblings share their parent's path, its selection is built once while they follow each other
+		parked, self.parked[self.current] = self.parked[self.current], []
+		parent = None
+		selection = None
+		for path, char, cell, node, swaps in parked:
+			if path is not parent:
+				parent = path
+				selection = Selection()
+				for step in path:
+					selection.next(step)
+
+			selection.next(char)
+			self.visit(board, selection, cell, node, swaps)
+			selection.previous()
+
+	def park(self, selection: Selection, char: SpellCastChar, cell: int, node: int, swaps: int):
+		# the branch waits for the first later tier with words below node. Only the path is kept, few long lived
+		# objects keep the garbage collector out of the way. Every push is followed by a visit, so while no visit
+		# started at this length the selection is the same as at the last park and siblings share its path
+		parent = (selection.length, self.pushed[selection.length])
+		if self.parent != parent:
+			self.parent = parent
+			self.parent_path = selection.path[:]
+
+		shards = self.trie.shard_mask[node]
+		for index in range(self.current + 1, len(self.masks)):
+			if shards & self.masks[index]:
+				self.parked[index].append((self.parent_path, char, cell, node, swaps))
+				return
+
+	def enter(self, board: Board, selection: Selection, cell: int, node: int, swaps: int):
+		self.steps += 1
+		if self.deadline is not None and self.steps % DEADLINE_CHECK == 0 and time.perf_counter() >= self.deadline:
+			raise DeadlineReached()
+
+		# children without allowed words below are skipped before anything is pushed, or parked for a later tier
+		trie = self.trie
+		allowed = self.allowed
+		code = board.letters[cell]
+
+		child = trie.child(node, code)
+		if child != NO_NODE:
+			if trie.shard_mask[child] & allowed:
+				selection.next(board.cells[cell])
+				self.visit(board, selection, cell, child, swaps)
+				selection.previous()
+			elif trie.shard_mask[child] & self.later:
+				self.park(selection, board.cells[cell], cell, child, swaps)
+
+		if swaps > 0:
+			for swap_code, swap_child in trie.children(node):
+				if swap_code == code:
+					continue
+
+				if trie.shard_mask[swap_child] & allowed:
+					selection.next(swap_char(board.cells[cell], swap_code))
+					self.visit(board, selection, cell, swap_child, swaps - 1)
+					selection.previous()
+				elif trie.shard_mask[swap_child] & self.later:
+					self.park(selection, swap_char(board.cells[cell], swap_code), cell, swap_child, swaps - 1)
+
+	def visit(self, board: Board, selection: Selection, cell: int, node: int, swaps: int):
+		self.visits += 1
+		self.pushed[selection.length] = self.visits
+		trie = self.trie
+		word_id = trie.terminal[node]
+		if word_id != NO_WORD and ((self.allowed | self.later) >> trie.word_shards[word_id]) & 1:
+			word = trie.words[word_id]
+			self.word_tiers[word] = self.shard_tiers[trie.word_shards[word_id]]
+			self.record(word, selection)
+
+		if trie.child_mask[node] == 0:
+			return
+
+		for neighbour in board.neighbour_cells[cell]:
+			if board.letters[neighbour] >= 0 and not (selection.visited >> neighbour) & 1:
+				self.enter(board, selection, neighbour, node, swaps)
+
+
+def solve(board: SpellCastMap, trie: Trie, k: int = 100, swap_available: int = 0,
+		  deadline_ms: typing.Union[float, None] = None) -> list[Selection]:
+	# k best words on the board in score order, branches that cannot beat the k-th best are cut.
+	# with a deadline the best words found until then
+	return TopKSolver(trie, k, deadline_ms).solve(board, swap_available)
@@ -1,10 +1,38 @@
 import typing
 import crayons
-import pymorton
 
 LETTERS = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v',
 		   'w', 'x', 'y', 'z']
 
+LETTER_VALUES = {
+	"a": 1,
+	"b": 4,
+	"c": 5,
+	"d": 3,
+	"e": 1,
+	"f": 5,
+	"g": 3,
+	"h": 4,
+	"i": 1,
+	"j": 7,
+	"k": 6,
+	"l": 3,
+	"m": 4,
+	"n": 2,
+	"o": 1,
+	"p": 4,
+	"q": 8,
+	"r": 2,
+	"s": 2,
+	"t": 2,
+	"u": 4,
+	"v": 5,
+	"w": 5,
+	"x": 7,
+	"y": 4,
+	"z": 8
+}
+
 
 class Vector:
 	x: int
@@ -80,6 +108,34 @@ class VectorMap(typing.Generic[T1]):
 		return self.get_at(v.x, v.y)
 
 
+NEIGHBOUR_OFFSETS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1)]  # same order as Vector.neighbour
+
+NEIGHBOURS_BY_SIZE: dict[int, tuple[list[list[int]], list[int]]] = {}
+
+
+def get_board_neighbours(size: int) -> tuple[list[list[int]], list[int]]:
+	# per cell neighbour indices and the same neighbours as a bitmask, shared by every board of a size
+	if size in NEIGHBOURS_BY_SIZE:
+		return NEIGHBOURS_BY_SIZE[size]
+
+	cells = []
+	masks = []
+	for index in range(size * size):
+		x, y = index % size, index // size
+		neighbours = []
+		mask = 0
+		for dx, dy in NEIGHBOUR_OFFSETS:
+			nx, ny = x + dx, y + dy
+			if 0 <= nx < size and 0 <= ny < size:
+				neighbours.append(ny * size + nx)
+				mask |= 1 << (ny * size + nx)
+		cells.append(neighbours)
+		masks.append(mask)
+
+	NEIGHBOURS_BY_SIZE[size] = (cells, masks)
+	return cells, masks
+
+
 class SingleChar:
 	char: str
 
@@ -109,6 +165,7 @@ class SpellCastChar:
 		self.mark_double = mark_double
 		self.swapped = False
 		self.swapped_from = None
+		self.cell = -1
 		if not (c.char in LETTERS):
 			raise Exception(f"char \"{c.char}\" not used in spellcast")
 
@@ -116,93 +173,132 @@ class SpellCastChar:
 		return self.value * self.multiplier
 
 
+class Board:
+	size: int
+	cells: list[typing.Union[SpellCastChar, None]]
+	letters: list[int]
+	values: list[int]
+	multipliers: list[float]
+	doubles: int
+	neighbour_cells: list[list[int]]
+	neighbour_masks: list[int]
+
+	def __init__(self, size: int):
+		self.size = size
+		self.cells = [None] * (size * size)
+		self.letters = [-1] * (size * size)
+		self.values = [0] * (size * size)
+		self.multipliers = [1.0] * (size * size)
+		self.doubles = 0
+		self.neighbour_cells, self.neighbour_masks = get_board_neighbours(size)
+
+	def index(self, x: int, y: int) -> int:
+		if not (0 <= x < self.size and 0 <= y < self.size):
+			raise Exception(f"({x}, {y}) is outside of the {self.size}x{self.size} board")
+
+		return y * self.size + x
+
+	def vector(self, index: int) -> Vector:
+		return Vector(index % self.size, index // self.size)
+
+	def set(self, index: int, char: SpellCastChar):
+		self.cells[index] = char
+		self.letters[index] = LETTERS.index(char.c.char)
+		self.values[index] = char.value
+		self.multipliers[index] = char.multiplier
+		if char.mark_double:
+			self.doubles |= 1 << index
+		else:
+			self.doubles &= ~(1 << index)
+
+	def is_filled(self, index: int) -> bool:
+		return self.cells[index] is not None
+
+
 class Selection:
-	word: dict[int, SpellCastChar]
-	elimination: dict[int, list[int]]
+	# path as a stack, with the visited cells, per depth eliminations and the score kept up to date on every push/pop
+	path: list[SpellCastChar]
+	elimination: list[int]
 
 	length: int
 
-	dirty: bool
+	visited: int
 
-	vectors: VectorMap[SpellCastChar]
+	sums: list[float]
+	doubles: int
+	swaps: int
 
 	def __init__(self):
-		self.word = {}
-		self.elimination = {}
-		self.length = 0
-		self.dirty = False
-		self.vectors = VectorMap()
+		self.reset()
 
 	def reset(self):
+		self.path = []
+		self.elimination = [0]
 		self.length = 0
-		self.word = {}
-		self.vectors = VectorMap()
-		self.dirty = True
+		self.visited = 0
+		self.sums = [0.0]  # value of the first n chars
+		self.doubles = 0
+		self.swaps = 0
 
 	def next(self, char: SpellCastChar):
+		self.path.append(char)
+		self.elimination.append(0)
 		self.length += 1
-		self.word[self.length] = char
-		self.vectors.add(char.v, char)
-		self.dirty = True
+		self.visited |= 1 << char.cell
+		self.sums.append(self.sums[-1] + char.value * char.multiplier)
+		if char.mark_double:
+			self.doubles += 1
+		if char.swapped:
+			self.swaps += 1
 
-	def eliminate(self, l: int, v: Vector):
-		self.elimination.setdefault(l, [])
-		self.elimination.get(l).append(pymorton.interleave2(v.x, v.y))
+	def eliminate(self, l: int, cell: int):
+		self.elimination[l] |= 1 << cell
 
-	def is_eliminated(self, v: Vector, l: typing.Union[int, None] = None):
+	def is_eliminated(self, cell: int, l: typing.Union[int, None] = None):
 		if l is None:
 			l = self.length
 
-		self.elimination.setdefault(l, [])
-
-		return pymorton.interleave2(v.x, v.y) in self.elimination.get(l)
+		return l < len(self.elimination) and (self.elimination[l] >> cell) & 1 == 1
 
 	def has(self, c: SingleChar):
-		for char in self.word.values():
+		for char in self.path:
 			if char.c.char == c.char:
 				return True
 		return False
 
 	def has_exact(self, tchar: SpellCastChar):
-		return self.vectors.get(tchar.v) is not None
+		return (self.visited >> tchar.cell) & 1 == 1
 
 	def previous(self):
 		if self.length < 1:
 			raise Exception("length < 1")
 
-		if self.length in self.elimination:
-			del self.elimination[self.length]
-
-		char = self.word.get(self.length)
-		self.word.pop(self.length)
-		self.vectors.clear(char.v.x, char.v.y)
+		char = self.path.pop()
+		self.elimination.pop()
+		self.sums.pop()
+		self.visited &= ~(1 << char.cell)
 		self.length -= 1
-		self.dirty = True
+		if char.mark_double:
+			self.doubles -= 1
+		if char.swapped:
+			self.swaps -= 1
 
 	def get_current(self) -> SpellCastChar:
-		return self.word[self.length]
+		return self.path[-1]
 
-	def get(self):
-		if self.dirty:
-			sorted_v = sorted(self.word.items())
-
-			self.word = {}
-
-			for offset, char in sorted_v:
-				self.word[offset] = char
-
-			self.dirty = False
-
-			return self.word
-		else:
-			return self.word
+	def get(self) -> dict[int, SpellCastChar]:
+		return dict(enumerate(self.path, 1))
 
 	def get_dirty(self) -> dict[int, SpellCastChar]:
-		return self.word
+		return self.get()
+
+	def get_path_value(self) -> float:
+		# letter values with multipliers, without the double points and length bonus
+		return self.sums[-1]
 
 	def get_text(self):
 		txt = ""
-		for c in self.get().values():
+		for c in self.path:
 			c_c = c.c.char
 			if c.swapped:
 				txt += crayons.red(c_c, bold=True)
@@ -215,72 +311,85 @@ class Selection:
 		return txt
 
 	def get_raw_text(self):
-		return "".join(map(lambda c: c.c.char, self.get().values()))
+		return "".join(map(lambda c: c.c.char, self.path))
 
 	def get_total_value(self):
-		value = sum(list(map(lambda c: c.get_value(), self.get().values())))
+		value = self.sums[-1]
 
-		if self.has_double_points():
+		if self.doubles > 0:
 			value *= 2
 
-		if len(self.word) >= 6:
+		if self.length >= 6:
 			value += 10
 
 		return value
 
 	def has_double_points(self):
-		for c in self.get().values():
-			if c.mark_double:
-				return True
-		return False
+		return self.doubles > 0
 
 	def get_swapped(self) -> list[SpellCastChar]:
-		results = []
-		for c in self.get().values():
-			if c.swapped:
-				results.append(c)
+		if self.swaps == 0:
+			return []
 
-		return results
+		return [c for c in self.path if c.swapped]
 
 	def get_text_vectors(self):
-		return "".join(map(lambda c: f"({c.v.x}, {c.v.y})", self.get().values()))
+		return "".join(map(lambda c: f"({c.v.x}, {c.v.y})", self.path))
 
 
 class SpellCastMap:
 	map: dict[int, dict[int, SpellCastChar]]
 	size: int
-	neighbours_cache: VectorMap[SpellCastChar]
+	board: Board
 	map_by_char: dict[str, list[int]]
+	bigrams: typing.Union[list[list[bool]], None]
 
 	def __init__(self, size: int):
 		self.map = {}
 		self.size = size
-		self.neighbours_cache = VectorMap()
+		self.board = Board(size)
 		self.map_by_char = {}
+		self.bigrams = None
 
 	def generate_map_by_char(self):
-		for v, c in self.vector_map().items():
-			self.map_by_char.setdefault(c.c.char, [])
-			self.map_by_char.get(c.c.char).append(pymorton.interleave2(v.x, v.y))
+		self.map_by_char = {}
+		for index, c in enumerate(self.board.cells):
+			if c is not None:
+				self.map_by_char.setdefault(c.c.char, [])
+				self.map_by_char.get(c.c.char).append(index)
+
+	def get_bigrams(self) -> list[list[bool]]:
+		# bigrams[a][b]: letter b sits on a cell adjacent to a cell of letter a somewhere on the board
+		if self.bigrams is not None:
+			return self.bigrams
+
+		board = self.board
+		bigrams = [[False] * len(LETTERS) for _ in LETTERS]
+		for index, letter in enumerate(board.letters):
+			if letter < 0:
+				continue
+			row = bigrams[letter]
+			for neighbour in board.neighbour_cells[index]:
+				if board.letters[neighbour] >= 0:
+					row[board.letters[neighbour]] = True
+
+		self.bigrams = bigrams
+		return bigrams
 
 	def find(self, char: str):
 		pos_list = self.map_by_char.get(char)
 
 		if pos_list is not None:
-			results = []
-			for pos in pos_list:
-				v = pymorton.deinterleave2(pos)
-				results.append(self.map[v[0]][v[1]])
-			return results
+			return [self.board.cells[index] for index in pos_list]
 		else:
 			return None
 
-	def get_neighbours(self, v: Vector):
-		if self.neighbours_cache.get(v) is not None:
-			return self.neighbours_cache.get(v)
-
-		neighbours = get_chars(v.neighbour(), self)
-		self.neighbours_cache.add(v, neighbours)
+	def get_neighbours(self, v: Vector) -> dict[Vector, SpellCastChar]:
+		neighbours = {}
+		for index in self.board.neighbour_cells[self.board.index(v.x, v.y)]:
+			char = self.board.cells[index]
+			if char is not None:
+				neighbours[char.v] = char
 
 		return neighbours
 
@@ -293,10 +402,12 @@ class SpellCastMap:
 		return result
 
 	def set(self, char: SpellCastChar) -> None:
+		char.cell = self.board.index(char.v.x, char.v.y)
 		if not char.v.x in self.map:
 			self.map[char.v.x] = {}
 		self.map[char.v.x][char.v.y] = char
-		self.neighbours_cache = VectorMap()
+		self.board.set(char.cell, char)
+		self.bigrams = None
 
 	def get(self, v: Vector) -> typing.Union[SpellCastChar, None]:
 		if v.x in self.map:
@@ -0,0 +1,188 @@
+import typing
+from array import array
+
+from spellcast import LETTERS, LETTER_VALUES
+
+ROOT = 0
+NO_NODE = -1
+NO_WORD = -1
+NO_LETTER = 255
+MAX_SHARDS = 64
+
+
+def letter_code(char: str) -> int:
+	return ord(char) - 97
+
+
+def popcount(value: int) -> int:
+	return bin(value).count("1")
+
+
+def is_playable(word: str) -> bool:
+	if len(word) <= 1:
+		return False
+
+	for char in word:
+		if not (char in LETTERS):
+			return False
+
+	return True
+
+
+# nodes are laid out breadth first, children of a node are contiguous in letter order:
+# child index = first_child + (set bits of child_mask below the letter)
+class Trie:
+	terminal: typing.Sequence[int]
+	child_mask: typing.Sequence[int]
+	first_child: typing.Sequence[int]
+	max_depth: typing.Sequence[int]
+	max_value: typing.Sequence[int]
+	suffix_mask: typing.Sequence[int]
+	shard_mask: typing.Sequence[int]
+	word_shards: typing.Sequence[int]
+	letter: typing.Sequence[int]
+	words: typing.Sequence[str]
+
+	def __init__(self, terminal: typing.Sequence[int], child_mask: typing.Sequence[int],
+				 first_child: typing.Sequence[int], max_depth: typing.Sequence[int], max_value: typing.Sequence[int],
+				 suffix_mask: typing.Sequence[int], words: typing.Sequence[str],
+				 shard_mask: typing.Sequence[int], word_shards: typing.Sequence[int], letter: typing.Sequence[int]):
+		self.terminal = terminal
+		self.child_mask = child_mask
+		self.first_child = first_child
+		# longest remaining letter count, highest remaining LETTER_VALUES sum and every letter
+		# of the words below a node
+		self.max_depth = max_depth
+		self.max_value = max_value
+		self.suffix_mask = suffix_mask
+		# the shard (dictionary tier and region) of every word and the shards of the words at or below a node
+		self.shard_mask = shard_mask
+		self.word_shards = word_shards
+		# letter code of the edge into a node, NO_LETTER for the root
+		self.letter = letter
+		self.words = words
+
+	@staticmethod
+	def from_words(words: typing.Iterable[str], shards: typing.Union[dict[str, int], None] = None):
+		# shards maps a word to its shard index, words without one are in shard 0
+		sorted_words = sorted(set(word for word in words if is_playable(word)))
+		word_shards = array("B", bytes(len(sorted_words)))
+		if shards is not None:
+			for word_id, word in enumerate(sorted_words):
+				shard = shards.get(word, 0)
+				if shard >= MAX_SHARDS:
+					raise Exception(f"at most {MAX_SHARDS} shards are supported, \"{word}\" is in shard {shard}")
+				word_shards[word_id] = shard
+
+		terminal = array("i")
+		child_mask = array("I")
+		first_child = array("i")
+		letter = array("B")
+
+		# (lo, hi, depth, code): node shared by sorted_words[lo:hi] with a common prefix of `depth` chars ending in code
+		queue = [(0, len(sorted_words), 0, NO_LETTER)]
+		head = 0
+
+		while head < len(queue):
+			lo, hi, depth, code = queue[head]
+			head += 1
+
+			word_id = NO_WORD
+			if lo < hi and len(sorted_words[lo]) == depth:
+				word_id = lo
+				lo += 1
+
+			mask = 0
+			first = len(queue)
+			start = lo
+			while start < hi:
+				char = sorted_words[start][depth]
+				end = start + 1
+				while end < hi and sorted_words[end][depth] == char:
+					end += 1
+
+				mask |= 1 << letter_code(char)
+				queue.append((start, end, depth + 1, letter_code(char)))
+				start = end
+
+			terminal.append(word_id)
+			child_mask.append(mask)
+			first_child.append(first if mask != 0 else NO_NODE)
+			letter.append(code)
+
+		# children always come after their parent, so one reverse pass sees every child first
+		max_depth = array("B", bytes(len(terminal)))
+		max_value = array("H", bytes(2 * len(terminal)))
+		suffix_mask = array("I", bytes(4 * len(terminal)))
+		shard_mask = array("Q", bytes(8 * len(terminal)))
+		for node in range(len(terminal) - 1, -1, -1):
+			if terminal[node] != NO_WORD:
+				shard_mask[node] = 1 << word_shards[terminal[node]]
+			mask = child_mask[node]
+			child = first_child[node]
+			code = 0
+			while mask:
+				if mask & 1:
+					max_depth[node] = max(max_depth[node], min(255, 1 + max_depth[child]))
+					max_value[node] = max(max_value[node], min(65535, LETTER_VALUES[LETTERS[code]] + max_value[child]))
+					suffix_mask[node] |= (1 << code) | suffix_mask[child]
+					shard_mask[node] |= shard_mask[child]
+					child += 1
+				mask >>= 1
+				code += 1
+
+		return Trie(terminal, child_mask, first_child, max_depth, max_value, suffix_mask, sorted_words, shard_mask,
+					word_shards, letter)
+
+	def node_count(self) -> int:
+		return len(self.terminal)
+
+	def word_count(self) -> int:
+		return len(self.words)
+
+	def child(self, node: int, code: int) -> int:
+		mask = self.child_mask[node]
+		if not (mask >> code) & 1:
+			return NO_NODE
+
+		return self.first_child[node] + popcount(mask & ((1 << code) - 1))
+
+	def children(self, node: int) -> list[tuple[int, int]]:
+		results = []
+		mask = self.child_mask[node]
+		child = self.first_child[node]
+		code = 0
+		while mask:
+			if mask & 1:
+				results.append((code, child))
+				child += 1
+			mask >>= 1
+			code += 1
+
+		return results
+
+	def get_word(self, node: int) -> typing.Union[str, None]:
+		word_id = self.terminal[node]
+		if word_id == NO_WORD:
+			return None
+
+		return self.words[word_id]
+
+	def find(self, prefix: str) -> int:
+		node = ROOT
+		for char in prefix:
+			if not (char in LETTERS):
+				return NO_NODE
+
+			node = self.child(node, letter_code(char))
+			if node == NO_NODE:
+				return NO_NODE
+
+		return node
+
+	def has_prefix(self, prefix: str) -> bool:
+		return self.find(prefix) != NO_NODE
+
+	def has_word(self, word: str) -> bool:
+		node = self.find(word)
+		return node != NO_NODE and self.terminal[node] != NO_WORD
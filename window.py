@@ -2,6 +2,7 @@ import pyautogui
 from pynput import mouse
 import time
 import sys
+import logger
 
 class AbsolutePosition():
 
@@ -74,3 +75,26 @@ class WindowSizeWizard:
 			return False
 
 		return True
+
+
+def load_default(path: str = "./default_spellcast_window.txt") -> WindowSizeWizard:
+	# saved window corners, the wizard is run when there are none
+	size_wizard = WindowSizeWizard()
+
+	with open(path, "r", encoding="utf-8") as f:
+		positions = f.read().split("\n")
+		if len(positions) == 6:
+			size_wizard.positions = {
+				0: AbsolutePosition(float(positions[0]), float(positions[1])),
+				1: AbsolutePosition(float(positions[2]), float(positions[3])),
+				2: AbsolutePosition(float(positions[4]), float(positions[5]))
+			}
+			size_wizard.finalize()
+
+			logger.Logger("Window").info("Loaded window size from default.")
+
+	if len(size_wizard.positions) != 3:
+		logger.Logger("Window").info("Run window size wizard for navigating.")
+		size_wizard.run()
+
+	return size_wizard
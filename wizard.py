@@ -0,0 +1,212 @@
+import pymorton
+import typing
+from typing import Union
+from spellcast import *
+
+
+class CharStream:
+	text: str
+
+	def __init__(self, text: str):
+		self.text = text
+		self.offset = 0
+
+	def is_eof(self):
+		return (self.offset + 1) == len(self.text)
+
+	def is_reached_eof(self):
+		return self.offset >= len(self.text)
+
+	def is_start(self):
+		return self.offset == 0
+
+	def next(self) -> str:
+		text = self.text[self.offset]
+		self.offset += 1
+
+		if len(self.text) <= self.offset:
+			raise Exception("no char in buffer")
+
+		return text
+
+	def previous(self):
+		self.offset -= 1
+
+		if self.offset < 0:
+			raise Exception("offset < 0")
+
+	def current(self) -> SingleChar:
+		return SingleChar(self.text[self.offset])
+
+	def __str__(self):
+		return self.current()
+
+
+class SpellCastCharFactory:
+	values: dict[str, int]
+
+	def __init__(self):
+		self.values = dict(LETTER_VALUES)
+
+	def get(self, v: Vector, c: SingleChar, multiplier: float = 1.0, mark_double: bool = False):
+		if not c.char in LETTERS:
+			raise Exception(f"char \"{c.char}\" not used in spellcast")
+
+		return SpellCastChar(v, c, self.values[c.char], multiplier, mark_double)
+
+
+class FindWordWizard:
+	selection: Selection
+	eliminated: list
+	start: SpellCastChar
+	word: CharStream
+	spellcast: SpellCastMap
+	success: bool
+
+	def __init__(self, start: SpellCastChar, target_word: str, spellcast_m: SpellCastMap, swap_available: int):
+		self.selection = Selection()
+		self.selection.next(start)
+		self.start = start
+		self.eliminated = []
+		self.word = CharStream(target_word)
+		self.word.next()
+		self.spellcast = spellcast_m
+		self.success = False
+		self.swap_available = swap_available
+		self.last_tried_swap = False
+
+	def __old_is_eliminated(self, v: Vector):
+		return pymorton.interleave2(v.x, v.y) in self.eliminated
+
+	def __old_eliminate(self, v: Vector):
+		self.eliminated.append(pymorton.interleave2(v.x, v.y))
+
+	def is_eliminated(self, cell: int):
+		return self.selection.is_eliminated(cell)
+
+	def eliminate(self, cell: int):
+		self.selection.eliminate(self.selection.length, cell)
+
+	def find_neighbours(self, cell: int, target_char: SingleChar) -> Union[SpellCastChar, None]:
+		board = self.spellcast.board
+		target = LETTERS.index(target_char.char)
+
+		for neighbour in board.neighbour_cells[cell]:
+			if board.letters[neighbour] == target and (not self.is_eliminated(neighbour)) and (
+					not (self.selection.visited >> neighbour) & 1):
+				return board.cells[neighbour]
+
+		return None
+
+	def check_selection(self):
+		if self.selection.get_raw_text() == self.word.text:
+			self.success = True
+		return self.success
+
+	def run(self):
+		while True:
+			current_char = self.word.current()
+
+			# print(self.selection.get_text() + f", {current_char}" + " / " + self.word.text)
+
+			result = self.find_neighbours(self.selection.get_current().cell, current_char)
+
+			found = result is not None
+
+			# 次のchar があったなら
+			if found:
+				self.selection.next(result)
+
+				# print("Attempting: " + self.selection.get_text() + " / " + self.word.text + f" (current: {
+				# current_char}, word_offset: {self.word.offset})")
+				if self.check_selection():
+					break
+
+				self.word.next()
+			if not found:
+				# print("not found")
+				if self.check_selection():
+					break
+
+				if self.word.offset <= 1:
+					break
+
+				if self.selection.swaps < self.swap_available and not self.last_tried_swap:
+					# まだスワップできて前回スワップ失敗していないなら
+
+					swap_result = Union[SpellCastChar, None]
+					scaffold = None
+					# print("try swap")
+
+					board = self.spellcast.board
+					for target in board.neighbour_cells[self.selection.get_current().cell]:
+						c = board.cells[target]
+						if c is not None and (not self.is_eliminated(target)) and (not self.selection.has_exact(c)):
+							swap_result = c
+							scaffold = target
+							break
+					swap_found = swap_result is not None
+
+					if swap_found and scaffold is not None:
+
+						char_swap_from = board.cells[scaffold]
+
+						char = SpellCastChar(char_swap_from.v, current_char, 0, char_swap_from.multiplier,
+							char_swap_from.mark_double)
+						char.cell = scaffold
+						char.swapped = True
+						char.swapped_from = char_swap_from
+
+						# self.spellcast.set(char)
+
+						self.selection.next(char)
+						if not self.word.is_eof():
+							self.word.next()
+
+						if self.check_selection():
+							break
+					else:
+						self.last_tried_swap = True
+					continue
+
+				# これ以上見つからなかったら現在のマスを排除されたとしてマークして、前のマスに戻る
+
+				before = self.selection.get_current()
+				self.word.previous()
+				if self.selection.length > 1:
+					self.selection.previous()
+
+				self.eliminate(before.cell)
+
+			self.last_tried_swap = False
+
+
+# print("break")
+
+
+def find_selection(spellcast_m: SpellCastMap, word_map: list, swap_available_m: int) -> list[FindWordWizard]:
+	results = []
+	for word_m in word_map:
+		starts = spellcast_m.find(word_m[0])
+		if starts is None:
+			continue
+		for c in starts:
+			wizard = FindWordWizard(c, word_m, spellcast_m, swap_available_m)
+			wizard.run()
+			results.append(wizard)
+
+	return results
+
+
+def iter_selections(spellcast_m: SpellCastMap, word_map: typing.Iterable[str],
+					swap_available_m: int) -> typing.Iterator[tuple[str, Selection]]:
+	# (word, path) of every successful wizard as soon as it finishes, failed wizards are dropped right away
+	for word_m in word_map:
+		starts = spellcast_m.find(word_m[0])
+		if starts is None:
+			continue
+		for c in starts:
+			wizard = FindWordWizard(c, word_m, spellcast_m, swap_available_m)
+			wizard.run()
+			if wizard.success:
+				yield word_m, wizard.selection
@@ -1,17 +1,26 @@
+import codecs
 import os
+import pathlib
 import sys
+import typing
 import urllib.error
 from urllib import request
 
-import git
-import tqdm
 import logger
+import dictionary
 import time
 import math
 import json
+import threading
 
 LOGGER = logger.Logger("Word Provider")
 
+SOURCES_FOLDER = "./words/.sources/"
+# regions of the tiered sources, the plain english list comes first within a tier
+SHARD_REGIONS = ["english", "american", "british", "canadian", "australian"]
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_TIMEOUT = 30
+
 providers = {
 	"jacksonrayhamilton": (
 		"raw",
@@ -74,146 +83,404 @@ providers = {
 }
 
 
-def download_all(stream_chunk_size: int = 12 * 1024):
-	for provider_name in providers.keys():
-		LOGGER.info(f"Downloading dictionary: \"{provider_name}\"")
-		download(provider_name, stream_chunk_size=stream_chunk_size)
+def download_all(stream_chunk_size: int = 12 * 1024, workers: int = DOWNLOAD_WORKERS):
+	LOGGER.info(f"Downloading dictionaries: {', '.join(providers.keys())}")
+	download_providers(list(providers.keys()), stream_chunk_size, workers)
+
+
+class Progress:
+	ascii_art_uv = [
+		'\\',
+		'/',
+		"-"
+	]
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.total_bytes = 0
+		self.expected_bytes = 0
+		self.sources = 0
+		self.done_sources = 0
+		self.bytes = 0
+		self.kbps = 0
+		self.current_uv = 0
+		self.last_second = math.floor(time.time())
+		self.last_display = 0
+
+	def expect(self, sources: int = 0, size: int = 0):
+		with self.lock:
+			self.sources += sources
+			self.expected_bytes += size
+
+	def source_done(self):
+		with self.lock:
+			self.done_sources += 1
+
+	def update(self, size: int):
+		with self.lock:
+			cur_time = time.time()
+			second = math.floor(cur_time)
+			self.bytes += size
+			self.total_bytes += size
+
+			if second != self.last_second:
+				self.kbps = self.bytes / 1024
+				self.bytes = 0
+				self.last_second = second
+
+			if cur_time - self.last_display >= 0.1:
+				self.current_uv += 1
+				if len(self.ascii_art_uv) <= self.current_uv:
+					self.current_uv = 0
+				uv = self.ascii_art_uv[self.current_uv]
+
+				percent = ""
+				if self.expected_bytes > 0:
+					percent = f" {min(100, round(self.total_bytes / self.expected_bytes * 100))}%"
+				sys.stdout.write(
+					f"\r>> {uv} | {self.done_sources}/{self.sources} files |{percent} "
+					f"{round(self.total_bytes / 1024, 2)}kb ({round(self.kbps, 1)} kb/s)        ")
+
+				self.last_display = cur_time
+
+	def finish(self, message: str = "Success!"):
+		sys.stdout.write(f"\r>> @ | {self.done_sources}/{self.sources} files | "
+						 f"{round(self.total_bytes / 1024, 2)}kb | {message}\n         ")
+
+
+class SourceMeta:
+	# ETag / Last-Modified of every downloaded source, used for conditional and resumed fetches
+
+	def __init__(self, path: str):
+		self.path = path
+		self.lock = threading.Lock()
+		self.entries = {}
+		if os.path.exists(path):
+			with open(path, "r", encoding="utf-8") as f:
+				self.entries = json.load(f)
+
+	def get(self, url: str) -> dict:
+		with self.lock:
+			return dict(self.entries.get(url, {}))
+
+	def set(self, url: str, entry: dict):
+		with self.lock:
+			self.entries[url] = entry
+			temp = self.path + ".tmp"
+			with open(temp, "w", encoding="utf-8") as f:
+				json.dump(self.entries, f, indent=1)
+			os.replace(temp, self.path)
+
+
+def fetch(url: str, path: str, meta: SourceMeta, progress: typing.Union[Progress, None] = None,
+		  stream_chunk_size: int = 12 * 1024, retry: bool = True) -> bool:
+	entry = meta.get(url)
+	validator = entry.get("etag") or entry.get("last_modified")
+	partial = path + ".part"
+	headers = {}
+
+	if os.path.exists(partial) and validator is not None:
+		headers["Range"] = f"bytes={os.path.getsize(partial)}-"
+		headers["If-Range"] = validator
+	elif os.path.exists(path) and entry.get("complete", False):
+		if entry.get("etag") is not None:
+			headers["If-None-Match"] = entry["etag"]
+		if entry.get("last_modified") is not None:
+			headers["If-Modified-Since"] = entry["last_modified"]
+
+	try:
+		url_data = request.urlopen(request.Request(url, headers=headers), timeout=DOWNLOAD_TIMEOUT)
+	except urllib.error.HTTPError as e:
+		if e.code == 304:
+			return False
+		if e.code == 416 and retry:
+			# partial file no longer matches the source, start over
+			os.unlink(partial)
+			return fetch(url, path, meta, progress, stream_chunk_size, False)
+		raise
+
+	with url_data:
+		resumed = getattr(url_data, "status", None) == 206
+		length = url_data.headers.get("Content-Length")
+		if progress is not None and length is not None:
+			progress.expect(size=int(length))
+
+		if not resumed:
+			entry = {}
+		meta.set(url, {
+			"etag": url_data.headers.get("ETag", entry.get("etag")),
+			"last_modified": url_data.headers.get("Last-Modified", entry.get("last_modified")),
+			"complete": False
+		})
+
+		with open(partial, "ab" if resumed else "wb") as f:
+			while True:
+				chunk_data = url_data.read(stream_chunk_size)
+				if not chunk_data:
+					break
+				f.write(chunk_data)
+				if progress is not None:
+					progress.update(len(chunk_data))
+
+	os.replace(partial, path)
+	entry = meta.get(url)
+	entry["complete"] = True
+	meta.set(url, entry)
+
+	return True
+
+
+def fetch_all(jobs: list[tuple[str, str, SourceMeta]], progress: typing.Union[Progress, None] = None,
+			  stream_chunk_size: int = 12 * 1024, workers: int = DOWNLOAD_WORKERS) -> dict[str, bool]:
+	# (url, path, meta) jobs -> url: changed, sources that failed with an http or network error are left out
+	results = {}
+	if progress is not None:
+		progress.expect(sources=len(jobs))
+
+	from concurrent import futures
+
+	with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+		submitted = {executor.submit(fetch, url, path, meta, progress, stream_chunk_size): url
+					 for url, path, meta in jobs}
+
+		for future in futures.as_completed(submitted):
+			url = submitted[future]
+			try:
+				results[url] = future.result()
+			except urllib.error.HTTPError as e:
+				LOGGER.warning(f"Skipping {url}: HTTP {e.code}")
+			except (urllib.error.URLError, OSError) as e:
+				# unreachable host, timeout or a failed write, the other sources go on
+				LOGGER.warning(f"Skipping {url}: {e}")
+			if progress is not None:
+				progress.source_done()
+
+	return results
+
+
+class JsonArrayReader:
+	# incremental reader for a top level json array, holds at most one unparsed element in memory
+
+	def __init__(self):
+		self.buffer = ""
+		self.started = False
+		self.finished = False
+		self.decoder = json.JSONDecoder()
+
+	def feed(self, text: str) -> list:
+		self.buffer += text
+		items = []
+		pos = 0
+
+		while not self.finished:
+			while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n,":
+				pos += 1
+			if pos >= len(self.buffer):
+				break
+
+			if not self.started:
+				if self.buffer[pos] != "[":
+					raise Exception("json word list must be an array")
+				self.started = True
+				pos += 1
+				continue
 
+			if self.buffer[pos] == "]":
+				self.finished = True
+				pos = len(self.buffer)
+				break
 
-def download(provider_name: str, stream_chunk_size: int = 12 * 1024):
-	if not provider_name in providers:
-		raise Exception(f"provider name \"{provider_name}\" not found")
+			try:
+				item, pos = self.decoder.raw_decode(self.buffer, pos)
+			except json.JSONDecodeError:
+				break  # element continues in the next chunk
+			items.append(item)
 
-	provider = providers[provider_name]
+		self.buffer = self.buffer[pos:]
+		return items
 
-	download_type = provider[0]
-	urls = provider[1]
 
-	output = ""
+def normalize(word: str) -> typing.Union[str, None]:
+	word = word.rstrip("\r")
+	if len(word) <= 1:
+		return None
+	if (not word.isascii()) or (not word.isalpha()):
+		return None
+	return word
 
-	if download_type.startswith("raw"):
-		output = get_file(provider_name)
-		download_type_split = download_type.split()
-		is_json = False
-		if len(download_type_split) > 1:
-			is_json = download_type_split[1] == "json"
 
-		files = []
-		last_second = math.floor(time.time())
-		last_display = 0
-		total_bytes = 0
-		bytes = 0
-		kbps = 0
-		current_uv = 0
-
-		times = 0
-		ascii_art_uv = [
-			'\\',
-			'/',
-			"-"
-		]
+def stream_words(stream: typing.BinaryIO, is_json: bool = False, stream_chunk_size: int = 12 * 1024,
+				 progress: typing.Union[Progress, None] = None) -> typing.Iterator[str]:
+	decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+	reader = JsonArrayReader() if is_json else None
+	pending = ""
+
+	while True:
+		chunk_data = stream.read(stream_chunk_size)
+		final = not chunk_data
+		text = decoder.decode(chunk_data, final=final)
+
+		if progress is not None and not final:
+			progress.update(len(chunk_data))
+
+		if reader is not None:
+			for word_json in reader.feed(text):
+				for word in word_json.values():
+					yield str(word)
+		else:
+			lines = (pending + text).split("\n")
+			pending = lines.pop()
+			for line in lines:
+				yield line
+
+		if final:
+			break
+
+	if reader is None and len(pending) > 0:
+		yield pending
 
-		for url in urls:
 
-			st_url = time.time()
+def ingest(urls: typing.Iterable[str], output: str, is_json: bool = False, stream_chunk_size: int = 12 * 1024,
+		   progress: typing.Union[Progress, None] = None, counts: typing.Union[dict[str, int], None] = None) -> int:
+	# network chunk -> decode -> normalize -> dedup -> output file, no stage holds more than one chunk
+	# of text; only the set of distinct words grows with the list. counts gets the new words of every url
+	seen = set()
+	temp = output + ".tmp"
 
-			base_url = os.path.basename(url)
-			seq_output = get_file("_" + base_url)
+	with open(temp, "w", encoding="utf-8") as f:
+		for url in urls:
 			try:
 				url_data = request.urlopen(url)
 			except urllib.error.HTTPError:
 				continue
 
-			end_url = time.time()
-
-			diff = end_url - st_url
-			last_display -= diff
-			last_second -= int(diff)
-
-			with open(seq_output, mode="wb") as f:
-				while True:
-					chunk_data = url_data.read(stream_chunk_size)
-					if not chunk_data:
-						break
-					f.write(chunk_data)
-
-					cur_time = time.time()
-					second = math.floor(time.time())
-					bytes += len(chunk_data)
-					total_bytes += len(chunk_data)
-					times += 1
-
-					if second != last_second:
-						kbps = bytes / 1024
-						bytes = 0
-						last_second = second
-
-					if cur_time - last_display >= 0.1:
-						current_uv += 1
-						if len(ascii_art_uv) <= current_uv:
-							current_uv = 0
-						uv = ascii_art_uv[current_uv]
-						sys.stdout.write(
-							f"\r>> {uv} | {round(total_bytes / 1024, 2)}kb ({round(kbps, 1)} kb/s)        ")
-
-						last_display = cur_time
-				files.append(seq_output)
-		sys.stdout.write(f"\r>> @ | {round(total_bytes / 1024, 2)}kb | Success!\n         ")
-
-		with open(output, "w", encoding="utf-8") as host_f:
-			for file in files:
-				with open(file, "rb") as read_f:
-					host_f.write(read_f.read().decode("utf-8", errors="ignore"))
-				os.unlink(file)
-
-		if is_json:
-			with open(output, "r", encoding="utf-8") as f:
-				js = json.load(f)
-			text = ""
-			for word_json in js:
-				for word in word_json.values():
-					text += f"{word}\n"
+			if counts is not None:
+				counts[url] = -len(seen)
+
+			with url_data:
+				for word in stream_words(url_data, is_json, stream_chunk_size, progress):
+					word = normalize(word)
+					if word is None or word in seen:
+						continue
+
+					if len(seen) > 0:
+						f.write("\n")
+					f.write(word)
+					seen.add(word)
+
+			if counts is not None:
+				counts[url] += len(seen)
+
+	os.replace(temp, output)
+
+	return len(seen)
+
 
-			with open(output, "w", encoding="utf-8") as f:
-				f.write(text)
+def source_shard(url: str) -> typing.Union[str, None]:
+	# ".../english-words.35" -> "english.35", None for sources without a tier
+	name, _, tier = os.path.basename(url).partition("-words.")
+	if not tier.isdigit() or name not in SHARD_REGIONS:
+		return None
 
+	return f"{name}.{tier}"
 
-		process(provider_name)
 
+def shard_rank(url: str) -> tuple[int, int]:
+	# common tiers first, then the regions in SHARD_REGIONS order
+	shard = source_shard(url)
+	if shard is None:
+		return 0, 0
 
+	region, tier = shard.split(".")
+	return int(tier), SHARD_REGIONS.index(region)
 
 
+def write_shards(provider_name: str, sources: list[str], counts: dict[str, int]):
+	# consecutive runs of the word list per shard, a word belongs to the most common shard it appears in
+	path = dictionary.shards_file(get_file(provider_name))
+	runs = [[source_shard(source), counts[source]] for source in sources if source in counts]
+	if any(shard is None for shard, _ in runs):
+		if os.path.exists(path):
+			os.unlink(path)
+		return
 
+	temp = path + ".tmp"
+	with open(temp, "w", encoding="utf-8") as f:
+		json.dump(runs, f)
+	os.replace(temp, path)
 
-	elif download_type == "unavailable":
-		print()
+
+def get_source_dir(provider_name: str):
+	return SOURCES_FOLDER + provider_name
+
+
+def get_source_file(provider_name: str, url: str):
+	return os.path.join(get_source_dir(provider_name), os.path.basename(url))
+
+
+def download(provider_name: str, stream_chunk_size: int = 12 * 1024, workers: int = DOWNLOAD_WORKERS):
+	download_providers([provider_name], stream_chunk_size, workers)
+
+
+def download_providers(provider_names: list[str], stream_chunk_size: int = 12 * 1024,
+					   workers: int = DOWNLOAD_WORKERS):
+	for provider_name in provider_names:
+		if not provider_name in providers:
+			raise Exception(f"provider name \"{provider_name}\" not found")
+
+	jobs = []
+	metas = {}
+	for provider_name in provider_names:
+		download_type, urls = providers[provider_name]
+		if not download_type.startswith("raw"):
+			continue
+
+		os.makedirs(get_source_dir(provider_name), exist_ok=True)
+		metas[provider_name] = SourceMeta(os.path.join(get_source_dir(provider_name), "sources.json"))
+		for url in urls:
+			jobs.append((url, get_source_file(provider_name, url), metas[provider_name]))
+
+	progress = Progress()
+	results = fetch_all(jobs, progress, stream_chunk_size, workers)
+	changed = len([url for url, url_changed in results.items() if url_changed])
+	progress.finish(f"{changed} changed, {len(results) - changed} unchanged")
+
+	for provider_name in metas.keys():
+		download_type, urls = providers[provider_name]
+		download_type_split = download_type.split()
+		is_json = False
+		if len(download_type_split) > 1:
+			is_json = download_type_split[1] == "json"
+
+		fetched = [url for url in urls if os.path.exists(get_source_file(provider_name, url))]
+		if is_downloaded(provider_name) and not any(results.get(url, False) for url in fetched):
+			LOGGER.info(f"Dictionary \"{provider_name}\" is up to date")
+			continue
+
+		fetched.sort(key=shard_rank)
+		sources = [pathlib.Path(os.path.abspath(get_source_file(provider_name, url))).as_uri() for url in fetched]
+		counts = {}
+		words = ingest(sources, get_file(provider_name), is_json, stream_chunk_size, counts=counts)
+		write_shards(provider_name, sources, counts)
+		LOGGER.info(f"Dictionary \"{provider_name}\": {words} words")
 
 
 def get_file(provider_name: str):
 	return "./words/" + provider_name + ".txt"
 
 
+def get_index_file(provider_name: str):
+	return "./words/" + provider_name + ".idx"
+
+
 def is_downloaded(provider_name: str) -> bool:
 	file = get_file(provider_name)
 	return os.path.exists(file) and os.path.isfile(file)
 
 
 def process(provider_name: str):
-	words_raw = get_providing(provider_name)
-
-	words = []
-
-	for word in tqdm.tqdm(words_raw.split("\n"), colour="cyan", desc="Processing words"):
-		if len(word) <= 1:
-			continue
-		if (not word.isascii()) or (not word.isalpha()):
-			continue
-		if word in words:
-			continue
-		words.append(word)
-
-	with open(get_file(provider_name), "w", encoding="utf-8") as f:
-		f.write("\n".join(words))
+	file = get_file(provider_name)
+	ingest([pathlib.Path(os.path.abspath(file)).as_uri()], file)
 
 
 def get_providing(provider_name: str, auto_download: bool = True):
@@ -230,6 +497,24 @@ def get_providing(provider_name: str, auto_download: bool = True):
 	return result
 
 
+def compile_index(provider_name: str):
+	LOGGER.info(f"Compiling word index: \"{provider_name}\"")
+	dictionary.build(get_file(provider_name), get_index_file(provider_name))
+
+
+def get_dictionary(provider_name: str, auto_download: bool = True) -> dictionary.CompiledDictionary:
+	if not is_downloaded(provider_name):
+		if auto_download:
+			download(provider_name)
+		else:
+			raise Exception(f"word list \"{provider_name}\" not found")
+
+	if not dictionary.is_current(get_index_file(provider_name), get_file(provider_name)):
+		compile_index(provider_name)
+
+	return dictionary.CompiledDictionary(get_index_file(provider_name))
+
+
 def get_default_provider():
 	with open("./word_provider.txt", "r", encoding="utf-8") as f:
 		word_provider = f.read()